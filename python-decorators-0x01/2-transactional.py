@@ -1,5 +1,6 @@
 import sqlite3
 import functools
+from query_cache import publish_writes, tables_written
 
 def with_db_connection(func):
   
@@ -15,15 +16,30 @@ def with_db_connection(func):
 
 
 def transactional(func):
+  """
+  Commits on success and rolls back on error. After a commit, the tables
+  written in the transaction are published so cached reads of them are
+  invalidated.
+
+  The written tables are collected with con.set_trace_callback(), which
+  sqlite3 can only set, not read. Any trace callback the caller installed
+  is replaced for the duration of the call and cleared afterwards; set it
+  again after the transaction if statement tracing is needed.
+  """
   @functools.wraps(func)
   def wrapper(con, *args, **kwargs):
+    written = set()
+    con.set_trace_callback(lambda statement: written.update(tables_written(statement)))
     try:
       result = func(con, *args, **kwargs)
       con.commit()
-      return result
     except Exception as e:
       con.rollback()
       return e
+    finally:
+      con.set_trace_callback(None)
+    publish_writes(written)
+    return result
   return wrapper
 
 
@@ -33,4 +49,5 @@ def update_user_email(con, user_id, new_email):
   cursor = con.cursor()
   cursor.execute("UPDATE users SET email = ? WHERE id = ?", (new_email, user_id))
 
-update_user_email(user_id=1, new_email='Crawford_Cartwright@hotmail.com')
+if __name__ == "__main__":
+  update_user_email(user_id=1, new_email='Crawford_Cartwright@hotmail.com')
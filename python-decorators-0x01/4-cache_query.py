@@ -1,27 +1,144 @@
+import asyncio
 import sqlite3
 import functools
+import inspect
+import threading
 import time
 
-query_cache = {}
+from concurrent.futures import ThreadPoolExecutor
 
-def cache_query(func):
-  @functools.wraps(func)
-  def wrapper(con, query, *args, **kwargs):
-    
-    if query in query_cache:
+from query_cache import (MISSING, AsyncSingleFlight, QueryCache, SingleFlight, make_key,
+                         tables_read)
+
+def cache_query(func=None, *, max_entries=1024, max_bytes=64 * 1024 * 1024, ttl=300,
+                single_flight=True, refresh_ahead=None, max_stale=0, connect=None):
+  """
+  Caches results by normalized query plus bound parameters in a bounded
+  LRU cache with a TTL (seconds).
+  Usable bare (@cache_query) or with limits (@cache_query(ttl=60)).
+  Entries are dropped when a @transactional write to a table they read
+  commits. On a miss, concurrent callers for the same key (threads, or
+  tasks when func is a coroutine function) wait for one query instead
+  of each running it. The wrapper exposes .cache, .cache_info() and
+  .cache_clear().
+
+  refresh_ahead (a fraction of ttl) turns on stale-while-revalidate:
+  once an entry is that old, callers still get the cached value while
+  it is re-queried in the background, on a connection from connect()
+  (the caller's own connection is closed by then). An expired entry is
+  served for at most max_stale seconds while its refresh runs.
+  """
+  if func is None:
+    return functools.partial(cache_query, max_entries=max_entries, max_bytes=max_bytes,
+                             ttl=ttl, single_flight=single_flight,
+                             refresh_ahead=refresh_ahead, max_stale=max_stale,
+                             connect=connect)
+  if refresh_ahead is not None and connect is None:
+    raise ValueError("refresh_ahead needs a connect() callable for background refreshes")
+
+  cache = QueryCache(max_entries=max_entries, max_bytes=max_bytes, ttl=ttl,
+                     refresh_ahead=refresh_ahead, max_stale=max_stale if refresh_ahead else 0)
+  refreshing = set()  # keys with a background refresh queued or running
+
+  def report(source, start_time):
+    end_time = time.time()
+    print(f"Fetching from {source} - Time taken: {(end_time - start_time) * 1000:.4f} ms")
+
+  if inspect.iscoroutinefunction(func):
+    flight = AsyncSingleFlight()
+    tasks = set()  # strong references to running refresh tasks
+
+    async def load(key, con, query, args, kwargs):
+      generation = cache.generation
+      result = await func(con, query, *args, **kwargs)
+      cache.set(key, result, tables=tables_read(query), generation=generation)
+      return result
+
+    async def refresh(key, query, args, kwargs):
+      try:
+        con = connect()
+        if inspect.isawaitable(con):
+          con = await con
+        try:
+          await flight.do(key, lambda: load(key, con, query, args, kwargs))
+        finally:
+          closed = con.close()
+          if inspect.isawaitable(closed):
+            await closed
+      except Exception as e:
+        print(f"Background refresh failed: {e}")
+      finally:
+        refreshing.discard(key)
+
+    @functools.wraps(func)
+    async def wrapper(con, query, *args, **kwargs):
       start_time = time.time()
-      result = query_cache[query]
-      end_time = time.time()
-      print(f"Fetching from cache - Time taken: {(end_time - start_time) * 1000:.4f} ms")
+      key = make_key(query, args, kwargs)
+      result, needs_refresh = cache.lookup(key)
+      if result is not MISSING:
+        if needs_refresh and key not in refreshing:
+          refreshing.add(key)
+          task = asyncio.create_task(refresh(key, query, args, kwargs))
+          tasks.add(task)
+          task.add_done_callback(tasks.discard)
+        report("cache", start_time)
+        return result
+
+      if single_flight:
+        result, shared = await flight.do(key, lambda: load(key, con, query, args, kwargs))
+      else:
+        result, shared = await load(key, con, query, args, kwargs), False
+      report("in-flight query" if shared else "database", start_time)
       return result
+  else:
+    flight = SingleFlight()
+    executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="cache-refresh")
+    refresh_lock = threading.Lock()
 
-    start_time = time.time()
-    result = func(con, query, *args, **kwargs)
-    end_time = time.time()
-    query_cache[query] = result
-    print(f"Fetching from database - Time taken: {(end_time - start_time) * 1000:.4f} ms")
-    return result
-    
+    def load(key, con, query, args, kwargs):
+      generation = cache.generation
+      result = func(con, query, *args, **kwargs)
+      cache.set(key, result, tables=tables_read(query), generation=generation)
+      return result
+
+    def refresh(key, query, args, kwargs):
+      try:
+        con = connect()
+        try:
+          flight.do(key, lambda: load(key, con, query, args, kwargs))
+        finally:
+          con.close()
+      except Exception as e:
+        print(f"Background refresh failed: {e}")
+      finally:
+        with refresh_lock:
+          refreshing.discard(key)
+
+    @functools.wraps(func)
+    def wrapper(con, query, *args, **kwargs):
+      start_time = time.time()
+      key = make_key(query, args, kwargs)
+      result, needs_refresh = cache.lookup(key)
+      if result is not MISSING:
+        if needs_refresh:
+          with refresh_lock:
+            start = key not in refreshing
+            refreshing.add(key)
+          if start:
+            executor.submit(refresh, key, query, args, kwargs)
+        report("cache", start_time)
+        return result
+
+      if single_flight:
+        result, shared = flight.do(key, lambda: load(key, con, query, args, kwargs))
+      else:
+        result, shared = load(key, con, query, args, kwargs), False
+      report("in-flight query" if shared else "database", start_time)
+      return result
+
+  wrapper.cache = cache
+  wrapper.cache_info = cache.info
+  wrapper.cache_clear = cache.clear
   return wrapper
     
 
@@ -39,15 +156,23 @@ def with_db_connection(func):
 
 @with_db_connection
 @cache_query
-def fetch_users_with_cache(con, query):
+def fetch_users_with_cache(con, query, params=()):
   cursor = con.cursor()
-  cursor.execute(query)
+  cursor.execute(query, params)
   return cursor.fetchall()
 
-#Test the caching
-users = fetch_users_with_cache(query="SELECT * FROM users")
-print(users)
+if __name__ == "__main__":
+  #Test the caching
+  users = fetch_users_with_cache(query="SELECT * FROM users")
+  print(users)
+
+  #Fetch from cache
+  users = fetch_users_with_cache(query="SELECT * FROM users")
+  print(users)
+  #Same query, different case and spacing: also from cache
+  users = fetch_users_with_cache(query="select *  from users")
 
-#Fetch from cache
-users = fetch_users_with_cache(query="SELECT * FROM users")
-print(users)
+  #Parameters are part of the key
+  user = fetch_users_with_cache(query="SELECT * FROM users WHERE id = ?", params=(1,))
+  print(user)
+  print(fetch_users_with_cache.cache_info())
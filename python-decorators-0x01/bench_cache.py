@@ -0,0 +1,127 @@
+"""
+Micro-benchmarks for the cache_query key path.
+
+Compares the cost of building a cache key (SQL fingerprint + parameters)
+with a real sqlite round trip for the same query, and counts how many
+database executions a burst of identical cold-cache calls causes with
+and without single-flight coalescing (threads and asyncio tasks):
+
+    python bench_cache.py
+"""
+import asyncio
+import contextlib
+import io
+import sqlite3
+import threading
+import time
+import timeit
+
+from query_cache import fingerprint, make_key
+
+cache_query = __import__('4-cache_query').cache_query
+
+QUERY = """
+  SELECT id, name, email
+  FROM   users
+  WHERE  email LIKE ? AND id > ?
+  ORDER  BY id
+"""
+PARAMS = ("%@example.com", 10)
+
+
+def _per_call_us(stmt, number):
+  return min(timeit.repeat(stmt, number=number, repeat=5)) / number * 1e6
+
+
+def _database(path):
+  con = sqlite3.connect(path)
+  con.execute("CREATE TABLE IF NOT EXISTS users (id INTEGER PRIMARY KEY, name TEXT, email TEXT)")
+  if not con.execute("SELECT 1 FROM users LIMIT 1").fetchone():
+    con.executemany("INSERT INTO users (name, email) VALUES (?, ?)",
+                    [(f"user{i}", f"user{i}@example.com") for i in range(1000)])
+    con.commit()
+  return con
+
+
+def bench_keys(number=20_000):
+  normalize = fingerprint.__wrapped__
+  fingerprint(QUERY)
+  return {
+    "fingerprint (uncached)": _per_call_us(lambda: normalize(QUERY), number),
+    "fingerprint (memoized)": _per_call_us(lambda: fingerprint(QUERY), number),
+    "make_key": _per_call_us(lambda: make_key(QUERY, PARAMS), number),
+  }
+
+
+def bench_round_trip(path=":memory:", number=2_000):
+  con = _database(path)
+  try:
+    return {f"sqlite round trip ({path})": _per_call_us(
+      lambda: con.execute(QUERY, PARAMS).fetchall(), number)}
+  finally:
+    con.close()
+
+
+def bench_burst_threads(callers=100, latency=0.05, single_flight=True):
+  """Database executions for `callers` threads hitting one cold key at once."""
+  executions = []
+
+  @cache_query(single_flight=single_flight)
+  def fetch(con, query):
+    executions.append(query)
+    time.sleep(latency)
+    return [(1, "user1")]
+
+  barrier = threading.Barrier(callers)
+
+  def call():
+    barrier.wait()
+    fetch(None, QUERY)
+
+  threads = [threading.Thread(target=call) for _ in range(callers)]
+  with contextlib.redirect_stdout(io.StringIO()):
+    for thread in threads:
+      thread.start()
+    for thread in threads:
+      thread.join()
+  return len(executions)
+
+
+def bench_burst_async(callers=100, latency=0.05, single_flight=True):
+  """Database executions for `callers` tasks awaiting one cold key at once."""
+  executions = []
+
+  @cache_query(single_flight=single_flight)
+  async def fetch(con, query):
+    executions.append(query)
+    await asyncio.sleep(latency)
+    return [(1, "user1")]
+
+  async def burst():
+    await asyncio.gather(*(fetch(None, QUERY) for _ in range(callers)))
+
+  with contextlib.redirect_stdout(io.StringIO()):
+    asyncio.run(burst())
+  return len(executions)
+
+
+def bench_bursts(callers=100):
+  return {
+    f"{kind}, {label}": run(callers, single_flight=flag)
+    for kind, run in (("threads", bench_burst_threads), ("asyncio", bench_burst_async))
+    for label, flag in (("no coalescing", False), ("single-flight", True))
+  }
+
+
+def print_results(results):
+  for name, us in results.items():
+    print(f"{name:<40}{us:>10.2f} us")
+
+
+if __name__ == "__main__":
+  results = bench_keys()
+  results.update(bench_round_trip())
+  print_results(results)
+  print("\nDatabase executions for a burst of 100 identical cold calls:")
+  for name, executions in bench_bursts(100).items():
+    print(f"{name:<40}{executions:>10}")
@@ -0,0 +1,398 @@
+import asyncio
+import re
+import sys
+import threading
+import time
+import weakref
+from collections import OrderedDict, namedtuple
+from concurrent.futures import Future
+from functools import lru_cache
+
+CacheInfo = namedtuple("CacheInfo", "hits misses stale_hits evictions expirations "
+                                    "invalidations entries bytes")
+
+_MISSING = object()
+MISSING = _MISSING  # lookup()'s miss marker
+
+# Published for a write whose target table could not be parsed: every
+# cache entry is invalidated. Read by a query whose tables could not be
+# parsed: the entry is invalidated by any write.
+ALL_TABLES = "*"
+
+_NAME = r"""[`"\[]?(?:\w+[`"\]]?\.[`"\[]?)?(\w+)[`"\]]?"""
+_JOIN_TABLES = re.compile(r"\bJOIN\s+" + _NAME, re.IGNORECASE)
+# A FROM list runs until the next clause keyword, a parenthesis or the end.
+_FROM_LISTS = re.compile(
+  r"\bFROM\s+(.+?)(?=\b(?:WHERE|JOIN|INNER|LEFT|RIGHT|FULL|CROSS|NATURAL|ON|USING|GROUP|"
+  r"ORDER|HAVING|LIMIT|OFFSET|UNION|INTERSECT|EXCEPT|WINDOW|RETURNING)\b|[();]|$)",
+  re.IGNORECASE | re.DOTALL)
+_TABLE_REF = re.compile(r"^\s*" + _NAME)
+_FROM = re.compile(r"\bFROM\b", re.IGNORECASE)
+# Innermost parenthesized group; tables_read() scans each subquery on its
+# own and leaves _DERIVED in its place, so an outer FROM list such as
+# `FROM (SELECT ...) t, orders` still parses.
+_GROUPS = re.compile(r"\(([^()]*)\)")
+_DERIVED = "_derived_"
+_WRITTEN_TABLES = re.compile(
+  r"^\s*(?:UPDATE(?:\s+OR\s+\w+)?|(?:INSERT|REPLACE)(?:\s+OR\s+\w+)?\s+INTO|DELETE\s+FROM)\s+"
+  + _NAME,
+  re.IGNORECASE)
+_WRITE_VERBS = re.compile(
+  r"\b(?:INSERT|UPDATE|DELETE|REPLACE|UPSERT|MERGE|DROP|ALTER|CREATE|TRUNCATE)\b",
+  re.IGNORECASE)
+_COMMENTS = re.compile(r"--[^\n]*|/\*.*?\*/", re.DOTALL)
+_STRINGS = re.compile(r"'(?:[^']|'')*'")
+
+# String literals and quoted identifiers are kept verbatim; everything
+# else is lower-cased and its whitespace collapsed.
+_SQL_TOKENS = re.compile(r"""('(?:[^']|'')*'|"(?:[^"]|"")*"|`[^`]*`|\[[^\]]*\])|(\s+)|([^'"`\[\s]+|.)""")
+
+# Every QueryCache, so a committed write can reach all of them.
+_caches = weakref.WeakSet()
+
+
+@lru_cache(maxsize=4096)
+def fingerprint(query):
+  """
+  Normalized form of a SQL string, so that case and whitespace variants
+  of the same statement (`SELECT * FROM users`, `select *  from users;`)
+  compare equal. Memoized: hot queries are normalized once.
+  """
+  parts = []
+  for quoted, space, other in _SQL_TOKENS.findall(query):
+    if quoted:
+      parts.append(quoted)
+    elif space:
+      parts.append(" ")
+    else:
+      parts.append(other.lower())
+  return "".join(parts).strip().rstrip(";").rstrip()
+
+
+def _freeze(value):
+  """Hashable stand-in for a bound parameter (lists/dicts become tuples)."""
+  if isinstance(value, (list, tuple)):
+    return tuple(_freeze(item) for item in value)
+  if isinstance(value, dict):
+    return tuple(sorted((k, _freeze(v)) for k, v in value.items()))
+  if isinstance(value, set):
+    return frozenset(value)
+  return value
+
+
+def make_key(query, params=(), kwargs=None):
+  """Cache key: the query's fingerprint plus its (frozen) parameters."""
+  key = (fingerprint(query), _freeze(params))
+  if kwargs:
+    key += (_freeze(kwargs),)
+  return key
+
+
+@lru_cache(maxsize=4096)
+def tables_read(query):
+  """
+  Lower-cased names of the tables a SELECT reads: every table in its
+  FROM lists (including comma-separated ones and those inside derived
+  tables and subqueries) and JOIN clauses. A query with a FROM whose
+  tables cannot be parsed gives {ALL_TABLES}, so any write invalidates it.
+  """
+  query = _STRINGS.sub("''", _COMMENTS.sub(" ", query))
+  fragments = []
+  while True:
+    fragments.extend(_GROUPS.findall(query))
+    reduced = _GROUPS.sub(f" {_DERIVED} ", query)
+    if reduced == query:
+      break
+    query = reduced
+  fragments.append(query)
+  names = set()
+  for fragment in fragments:
+    names.update(_JOIN_TABLES.findall(fragment))
+    for from_list in _FROM_LISTS.findall(fragment):
+      for ref in from_list.split(","):
+        match = _TABLE_REF.match(ref)
+        if match:
+          names.add(match.group(1))
+        elif ref.strip():
+          return frozenset([ALL_TABLES])
+  names.discard(_DERIVED)
+  if not names and any(_FROM.search(fragment) for fragment in fragments):
+    return frozenset([ALL_TABLES])
+  return frozenset(name.lower() for name in names)
+
+
+def tables_written(statement):
+  """
+  Lower-cased name of the table an INSERT/UPDATE/DELETE/REPLACE writes.
+  Any other statement that may write (a WITH ... UPDATE, DDL, ...) gives
+  {ALL_TABLES}, so a target that cannot be parsed invalidates everything.
+  Statements that cannot write give an empty set.
+  """
+  statement = _COMMENTS.sub(" ", statement)
+  match = _WRITTEN_TABLES.match(statement)
+  if match:
+    return frozenset([match.group(1).lower()])
+  if _WRITE_VERBS.search(_STRINGS.sub("''", statement)):
+    return frozenset([ALL_TABLES])
+  return frozenset()
+
+
+def publish_writes(tables):
+  """
+  Evicts entries that read any of `tables` from every live cache
+  (all entries when ALL_TABLES is among them).
+  """
+  if tables:
+    for cache in list(_caches):
+      cache.invalidate_tables(tables)
+
+
+def sizeof(value):
+  """Approximate memory footprint of a query result (rows of plain values)."""
+  size = sys.getsizeof(value)
+  if isinstance(value, (list, tuple, set, frozenset)):
+    size += sum(sizeof(item) for item in value)
+  elif isinstance(value, dict):
+    size += sum(sizeof(k) + sizeof(v) for k, v in value.items())
+  return size
+
+
+class QueryCache:
+  """
+  Thread-safe LRU cache with a per-entry TTL.
+
+  Entries are evicted least-recently-used first once there are more than
+  max_entries of them or their combined size passes max_bytes. An entry
+  older than its TTL is treated as a miss and dropped. Entries remember
+  the tables they were read from, so publish_writes() can drop exactly
+  the ones a committed write made stale.
+
+  With refresh_ahead (a fraction of the TTL, e.g. 0.8) lookup() flags an
+  entry for refresh once it is that old, and an expired entry is still
+  served, flagged, for up to max_stale seconds before it is dropped.
+  """
+
+  def __init__(self, max_entries=1024, max_bytes=64 * 1024 * 1024, ttl=300,
+               refresh_ahead=None, max_stale=0):
+    if refresh_ahead is not None and not 0 < refresh_ahead <= 1:
+      raise ValueError("refresh_ahead must be a fraction of the TTL in (0, 1]")
+    self.max_entries = max_entries
+    self.max_bytes = max_bytes
+    self.ttl = ttl
+    self.refresh_ahead = refresh_ahead
+    self.max_stale = max_stale
+    self._entries = OrderedDict()  # key -> (value, size, expires_at, tables, refresh_at)
+    self._by_table = {}  # table -> keys of entries that read it
+    self._bytes = 0
+    self._lock = threading.RLock()
+    self.hits = 0
+    self.misses = 0
+    self.stale_hits = 0
+    self.evictions = 0
+    self.expirations = 0
+    self.invalidations = 0
+    self.generation = 0  # bumped by every invalidate_tables()
+    _caches.add(self)
+
+  def get(self, key, default=_MISSING):
+    """Returns the cached value, or `default` on a miss (raises KeyError if not given)."""
+    value, _ = self.lookup(key)
+    if value is _MISSING:
+      if default is _MISSING:
+        raise KeyError(key)
+      return default
+    return value
+
+  def lookup(self, key):
+    """
+    Returns (value, needs_refresh); value is query_cache.MISSING on a
+    miss. needs_refresh is True once the entry is past its refresh point
+    or is being served stale.
+    """
+    with self._lock:
+      entry = self._entries.get(key)
+      if entry is None:
+        self.misses += 1
+        return _MISSING, False
+      value, _, expires_at, _, refresh_at = entry
+      now = time.monotonic()
+      stale = expires_at is not None and expires_at <= now
+      if stale and expires_at + self.max_stale <= now:
+        self._remove(key)
+        self.expirations += 1
+        self.misses += 1
+        return _MISSING, False
+      self._entries.move_to_end(key)
+      if stale:
+        self.stale_hits += 1
+      else:
+        self.hits += 1
+      return value, stale or (refresh_at is not None and refresh_at <= now)
+
+  def set(self, key, value, ttl=None, tables=(), generation=None):
+    """
+    Stores `value`, read from `tables`; ttl overrides the cache default
+    (None there means no expiry). Pass the `generation` seen before the
+    query ran to skip storing a result that a write may have overtaken.
+    """
+    ttl = self.ttl if ttl is None else ttl
+    tables = frozenset(tables)
+    size = sizeof(value)
+    with self._lock:
+      if generation is not None and generation != self.generation:
+        return
+      if key in self._entries:
+        self._remove(key)
+      if size > self.max_bytes:
+        return  # would evict everything else and still not fit
+      now = time.monotonic()
+      expires_at = refresh_at = None
+      if ttl is not None:
+        expires_at = now + ttl
+        if self.refresh_ahead is not None:
+          refresh_at = now + ttl * self.refresh_ahead
+      self._entries[key] = (value, size, expires_at, tables, refresh_at)
+      self._bytes += size
+      for table in tables:
+        self._by_table.setdefault(table, set()).add(key)
+      while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+        oldest = next(iter(self._entries))
+        self._remove(oldest)
+        self.evictions += 1
+
+  def invalidate(self, key):
+    with self._lock:
+      if key in self._entries:
+        self._remove(key)
+
+  def invalidate_tables(self, tables):
+    """
+    Drops every entry that read one of `tables` (every entry for
+    ALL_TABLES), and every entry whose tables are unknown.
+    """
+    with self._lock:
+      keys = set(self._by_table.get(ALL_TABLES, ()))
+      if ALL_TABLES in tables:
+        keys.update(self._entries)
+      for table in tables:
+        keys.update(self._by_table.get(table, ()))
+      for key in keys:
+        self._remove(key)
+      self.invalidations += len(keys)
+      self.generation += 1
+
+  def clear(self):
+    with self._lock:
+      self._entries.clear()
+      self._by_table.clear()
+      self._bytes = 0
+
+  def _remove(self, key):
+    _, size, _, tables, _ = self._entries.pop(key)
+    self._bytes -= size
+    for table in tables:
+      keys = self._by_table[table]
+      keys.discard(key)
+      if not keys:
+        del self._by_table[table]
+
+  def info(self):
+    with self._lock:
+      return CacheInfo(self.hits, self.misses, self.stale_hits, self.evictions,
+                       self.expirations, self.invalidations, len(self._entries), self._bytes)
+
+  def __len__(self):
+    return len(self._entries)
+
+  def __contains__(self, key):
+    with self._lock:
+      entry = self._entries.get(key)
+      return entry is not None and (entry[2] is None
+                                    or entry[2] + self.max_stale > time.monotonic())
+
+
+class SingleFlight:
+  """
+  Coalesces concurrent calls per key across threads: the first caller
+  runs the function, the others block on its Future and share the
+  result (or the exception).
+  """
+
+  def __init__(self):
+    self._lock = threading.Lock()
+    self._calls = {}  # key -> Future of the call in flight
+
+  def do(self, key, fn):
+    """Returns (result, shared); shared is True for callers that waited."""
+    with self._lock:
+      future = self._calls.get(key)
+      leader = future is None
+      if leader:
+        future = self._calls[key] = Future()
+    if not leader:
+      return future.result(), True
+    try:
+      result = fn()
+    except BaseException as e:
+      future.set_exception(e)
+      raise
+    else:
+      future.set_result(result)
+      return result, False
+    finally:
+      with self._lock:
+        del self._calls[key]
+
+
+class AsyncSingleFlight:
+  """
+  SingleFlight for coroutines. Calls are coalesced per event loop: each
+  running loop gets its own table of in-flight futures, so one decorated
+  coroutine can be used from several loops (and threads) at once.
+  """
+
+  def __init__(self):
+    self._lock = threading.Lock()
+    self._loops = weakref.WeakKeyDictionary()  # loop -> {key: Future in flight}
+
+  def _calls(self):
+    loop = asyncio.get_running_loop()
+    with self._lock:
+      calls = self._loops.get(loop)
+      if calls is None:
+        calls = self._loops[loop] = {}
+      return loop, calls
+
+  async def do(self, key, coro_fn):
+    """
+    Returns (result, shared); shared is True for callers that waited. If
+    the leading task is cancelled its waiters are not: one of them takes
+    over and runs the call itself.
+    """
+    loop, calls = self._calls()
+    while True:
+      future = calls.get(key)
+      if future is None:
+        break
+      try:
+        # shield: a cancelled follower must not cancel the leader's result
+        return await asyncio.shield(future), True
+      except asyncio.CancelledError:
+        if not future.cancelled():
+          raise  # this caller was cancelled, not the leader
+    future = calls[key] = loop.create_future()
+    try:
+      result = await coro_fn()
+    except asyncio.CancelledError:
+      # Wake the waiters without handing them this task's cancellation.
+      future.cancel()
+      raise
+    except BaseException as e:
+      future.set_exception(e)
+      future.exception()  # retrieved here, so no warning when nobody waited
+      raise
+    else:
+      future.set_result(result)
+      return result, False
+    finally:
+      del calls[key]
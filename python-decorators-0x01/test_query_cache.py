@@ -0,0 +1,507 @@
+#!/usr/bin/env python3
+"""Unit tests for the query_cache module and the cache_query decorator.
+"""
+import asyncio
+import contextlib
+import io
+import sqlite3
+import threading
+import time
+import unittest
+from unittest.mock import patch
+
+from query_cache import (ALL_TABLES, MISSING, AsyncSingleFlight, QueryCache, SingleFlight,
+                         fingerprint, make_key, publish_writes, sizeof, tables_read,
+                         tables_written)
+
+cache_query = __import__('4-cache_query').cache_query
+transactional = __import__('2-transactional').transactional
+
+
+class FakeClock:
+  """Stands in for the time module inside query_cache.
+  """
+
+  def __init__(self):
+    self.now = 1000.0
+
+  def monotonic(self):
+    return self.now
+
+
+class ClockTestCase(unittest.TestCase):
+  """Runs each test with query_cache's clock under test control.
+  """
+
+  def setUp(self):
+    self.clock = FakeClock()
+    patcher = patch("query_cache.time", self.clock)
+    patcher.start()
+    self.addCleanup(patcher.stop)
+
+
+class TestEviction(unittest.TestCase):
+  """Test cases for LRU and byte-size eviction.
+  """
+
+  def test_least_recently_used_is_evicted(self):
+    """A get() refreshes recency, so the untouched entry goes first.
+    """
+    cache = QueryCache(max_entries=2, ttl=None)
+    cache.set("a", [1])
+    cache.set("b", [2])
+    cache.get("a")
+    cache.set("c", [3])
+    self.assertIn("a", cache)
+    self.assertNotIn("b", cache)
+    self.assertIn("c", cache)
+    self.assertEqual(cache.info().evictions, 1)
+
+  def test_byte_limit(self):
+    """Entries are evicted until the total size fits max_bytes.
+    """
+    value = "x" * 200
+    cache = QueryCache(max_bytes=sizeof(value) * 2 + 10, ttl=None)
+    for key in "abc":
+      cache.set(key, value)
+    self.assertEqual(len(cache), 2)
+    self.assertNotIn("a", cache)
+    self.assertLessEqual(cache.info().bytes, cache.max_bytes)
+
+  def test_oversized_value_is_not_stored(self):
+    """A value larger than max_bytes is skipped without evicting others.
+    """
+    cache = QueryCache(max_bytes=1000, ttl=None)
+    cache.set("small", [1])
+    cache.set("huge", "x" * 5000)
+    self.assertIn("small", cache)
+    self.assertNotIn("huge", cache)
+
+  def test_replacing_a_key_updates_bytes(self):
+    """Overwriting an entry does not double-count its size.
+    """
+    cache = QueryCache(ttl=None)
+    cache.set("a", "x" * 100)
+    cache.set("a", "y" * 100)
+    self.assertEqual(cache.info().bytes, sizeof("y" * 100))
+
+  def test_get_without_default_raises(self):
+    """get() raises KeyError on a miss unless a default is given.
+    """
+    cache = QueryCache()
+    with self.assertRaises(KeyError):
+      cache.get("missing")
+    self.assertIsNone(cache.get("missing", None))
+    self.assertEqual(cache.info().misses, 2)
+
+
+class TestExpiry(ClockTestCase):
+  """Test cases for TTL, refresh-ahead and max_stale.
+  """
+
+  def test_ttl_expiry(self):
+    """An entry is a hit before its TTL and a miss after it.
+    """
+    cache = QueryCache(ttl=10)
+    cache.set("a", [1])
+    self.clock.now += 9.9
+    self.assertEqual(cache.get("a"), [1])
+    self.clock.now += 0.2
+    self.assertIsNone(cache.get("a", None))
+    info = cache.info()
+    self.assertEqual((info.hits, info.misses, info.expirations, info.entries), (1, 1, 1, 0))
+
+  def test_per_entry_ttl(self):
+    """set(ttl=...) overrides the default; ttl=None never expires.
+    """
+    cache = QueryCache(ttl=None)
+    cache.set("short", [1], ttl=1)
+    cache.set("forever", [2])
+    self.clock.now += 1e6
+    self.assertNotIn("short", cache)
+    self.assertIn("forever", cache)
+
+  def test_refresh_ahead_and_max_stale(self):
+    """lookup() flags entries past the refresh point; stale serving is bounded.
+    """
+    cache = QueryCache(ttl=10, refresh_ahead=0.8, max_stale=5)
+    cache.set("a", [1])
+    self.clock.now += 7
+    self.assertEqual(cache.lookup("a"), ([1], False))
+    self.clock.now += 1
+    self.assertEqual(cache.lookup("a"), ([1], True))
+    self.clock.now += 4  # 2s past the TTL, within max_stale
+    self.assertEqual(cache.lookup("a"), ([1], True))
+    self.assertEqual(cache.info().stale_hits, 1)
+    self.clock.now += 3.5  # 5.5s past the TTL
+    self.assertEqual(cache.lookup("a"), (MISSING, False))
+
+  def test_refresh_ahead_is_validated(self):
+    """refresh_ahead must be a fraction in (0, 1].
+    """
+    for fraction in (0, 1.5):
+      with self.assertRaises(ValueError):
+        QueryCache(refresh_ahead=fraction)
+
+
+class TestInvalidation(unittest.TestCase):
+  """Test cases for table-aware invalidation and the generation check.
+  """
+
+  def test_only_entries_reading_the_table_are_dropped(self):
+    """invalidate_tables() drops exactly the entries that read the table.
+    """
+    cache = QueryCache(ttl=None)
+    cache.set("users", [1], tables={"users"})
+    cache.set("join", [2], tables={"users", "orders"})
+    cache.set("orders", [3], tables={"orders"})
+    cache.invalidate_tables({"users"})
+    self.assertEqual([key in cache for key in ("users", "join", "orders")],
+                     [False, False, True])
+    self.assertEqual(cache.info().invalidations, 2)
+
+  def test_all_tables_wildcard(self):
+    """ALL_TABLES drops every entry, whatever it read.
+    """
+    cache = QueryCache(ttl=None)
+    cache.set("a", [1], tables={"users"})
+    cache.set("b", [2])
+    cache.invalidate_tables({ALL_TABLES})
+    self.assertEqual(len(cache), 0)
+
+  def test_publish_reaches_every_cache(self):
+    """publish_writes() invalidates across all live caches.
+    """
+    first, second = QueryCache(ttl=None), QueryCache(ttl=None)
+    first.set("a", [1], tables={"users"})
+    second.set("b", [2], tables={"users"})
+    publish_writes({"users"})
+    self.assertNotIn("a", first)
+    self.assertNotIn("b", second)
+
+  def test_stale_generation_is_not_stored(self):
+    """A result read before an invalidation is discarded.
+    """
+    cache = QueryCache(ttl=None)
+    generation = cache.generation
+    cache.invalidate_tables({"users"})
+    cache.set("a", [1], tables={"users"}, generation=generation)
+    self.assertNotIn("a", cache)
+    cache.set("a", [1], tables={"users"}, generation=cache.generation)
+    self.assertIn("a", cache)
+
+  def test_tables_read(self):
+    """FROM lists, comma joins, JOINs and subqueries are all found.
+    """
+    cases = [
+      ("SELECT * FROM users", {"users"}),
+      ("SELECT * FROM users, orders", {"users", "orders"}),
+      ("select * from main.Users u, \"orders\" AS o JOIN logs l ON 1", {"users", "orders", "logs"}),
+      ("SELECT * FROM users WHERE id IN (SELECT user_id FROM orders, items)",
+       {"users", "orders", "items"}),
+      ("SELECT * FROM users WHERE name = 'a from b, c'", {"users"}),
+      ("SELECT * FROM (SELECT email FROM users) t", {"users"}),
+      ("SELECT * FROM (SELECT email FROM users) t, orders", {"users", "orders"}),
+      ("SELECT COUNT(*) FROM users", {"users"}),
+      ("SELECT 1", set()),
+    ]
+    for query, expected in cases:
+      with self.subTest(query=query):
+        self.assertEqual(tables_read(query), frozenset(expected))
+
+  def test_unparsed_reads_are_invalidated_by_any_write(self):
+    """A FROM with no parseable table is tagged ALL_TABLES and dropped on every write.
+    """
+    query = "SELECT * FROM (VALUES (1)) v"
+    self.assertEqual(tables_read(query), frozenset([ALL_TABLES]))
+    cache = QueryCache(ttl=None)
+    cache.set("unknown", [1], tables=tables_read(query))
+    cache.set("orders", [2], tables={"orders"})
+    cache.invalidate_tables({"users"})
+    self.assertNotIn("unknown", cache)
+    self.assertIn("orders", cache)
+
+  def test_tables_written(self):
+    """Parsable writes name their table; unparsable writes name ALL_TABLES.
+    """
+    cases = [
+      ("UPDATE users SET email = ? WHERE id = ?", {"users"}),
+      ("INSERT OR REPLACE INTO main.users VALUES (1)", {"users"}),
+      ("DELETE FROM `users`", {"users"}),
+      ("/* audit */ UPDATE users SET a = 1", {"users"}),
+      ("-- note\nDELETE FROM users", {"users"}),
+      ("WITH x AS (SELECT 1) UPDATE users SET a = 1", {ALL_TABLES}),
+      ("DROP TABLE users", {ALL_TABLES}),
+      ("SELECT 'update' FROM users", set()),
+      ("BEGIN ", set()),
+      ("COMMIT", set()),
+    ]
+    for statement, expected in cases:
+      with self.subTest(statement=statement):
+        self.assertEqual(tables_written(statement), frozenset(expected))
+
+
+class TestKeys(unittest.TestCase):
+  """Test cases for SQL fingerprints and cache keys.
+  """
+
+  def test_fingerprint_normalizes_case_and_whitespace(self):
+    """Case, whitespace and a trailing semicolon do not matter.
+    """
+    self.assertEqual(fingerprint("SELECT * FROM users"),
+                     fingerprint("  select *\n  from   USERS ;"))
+
+  def test_fingerprint_keeps_literals(self):
+    """String literals and quoted identifiers are kept verbatim.
+    """
+    self.assertNotEqual(fingerprint("SELECT * FROM t WHERE a = 'Bob'"),
+                        fingerprint("SELECT * FROM t WHERE a = 'bob'"))
+    self.assertIn("'Bob  X'", fingerprint("SELECT 'Bob  X'"))
+
+  def test_make_key_includes_parameters(self):
+    """Different parameters give different keys; equal ones the same key.
+    """
+    query = "SELECT * FROM users WHERE id = ?"
+    self.assertNotEqual(make_key(query, (1,)), make_key(query, (2,)))
+    self.assertEqual(make_key(query, (1,)), make_key(query.lower(), (1,)))
+    self.assertNotEqual(make_key(query, (), {"id": 1}), make_key(query, (), {"id": 2}))
+
+  def test_make_key_freezes_unhashable_parameters(self):
+    """Lists, dicts and sets become hashable key parts.
+    """
+    key = make_key("SELECT 1", ([1, 2], {"a": [3]}, {4}))
+    hash(key)
+    self.assertEqual(key, make_key("SELECT 1", ((1, 2), {"a": (3,)}, frozenset({4}))))
+
+
+class TestSingleFlight(unittest.TestCase):
+  """Test cases for thread single-flight.
+  """
+
+  def test_concurrent_calls_share_one_execution(self):
+    """Concurrent callers for one key get the leader's result.
+    """
+    flight, calls, results = SingleFlight(), [], []
+    barrier = threading.Barrier(20)
+
+    def load():
+      calls.append(1)
+      time.sleep(0.1)
+      return "rows"
+
+    def call():
+      barrier.wait()
+      results.append(flight.do("k", load))
+
+    threads = [threading.Thread(target=call) for _ in range(20)]
+    for thread in threads:
+      thread.start()
+    for thread in threads:
+      thread.join()
+    self.assertEqual(len(calls), 1)
+    self.assertEqual(sorted(shared for _, shared in results), [False] + [True] * 19)
+    self.assertTrue(all(result == "rows" for result, _ in results))
+
+  def test_exception_is_shared_and_key_released(self):
+    """Waiters get the leader's exception; the next call runs again.
+    """
+    flight, errors = SingleFlight(), []
+    started = threading.Event()
+
+    def fail():
+      started.set()
+      time.sleep(0.05)
+      raise ValueError("boom")
+
+    def call():
+      try:
+        flight.do("k", fail)
+      except ValueError as e:
+        errors.append(e)
+
+    leader = threading.Thread(target=call)
+    leader.start()
+    started.wait()
+    follower = threading.Thread(target=call)
+    follower.start()
+    leader.join()
+    follower.join()
+    self.assertEqual(len(errors), 2)
+    self.assertEqual(flight.do("k", lambda: 1), (1, False))
+
+
+class TestAsyncSingleFlight(unittest.IsolatedAsyncioTestCase):
+  """Test cases for asyncio single-flight.
+  """
+
+  async def test_burst_runs_once(self):
+    """A burst of tasks for one key runs the coroutine once.
+    """
+    flight, calls = AsyncSingleFlight(), []
+
+    async def load():
+      calls.append(1)
+      await asyncio.sleep(0.01)
+      return "rows"
+
+    results = await asyncio.gather(*(flight.do("k", load) for _ in range(50)))
+    self.assertEqual(len(calls), 1)
+    self.assertEqual({result for result, _ in results}, {"rows"})
+
+  async def test_cancelled_leader_does_not_cancel_waiters(self):
+    """A waiter takes over when the leader is cancelled.
+    """
+    flight, calls = AsyncSingleFlight(), []
+
+    async def load():
+      calls.append(1)
+      await asyncio.sleep(0.05)
+      return len(calls)
+
+    leader = asyncio.create_task(flight.do("k", load))
+    await asyncio.sleep(0.01)
+    waiter = asyncio.create_task(flight.do("k", load))
+    await asyncio.sleep(0.01)
+    leader.cancel()
+    self.assertEqual(await waiter, (2, False))
+    self.assertTrue(leader.cancelled())
+
+  async def test_cancelled_waiter_does_not_cancel_leader(self):
+    """Cancelling a waiter leaves the leader's call running.
+    """
+    flight = AsyncSingleFlight()
+
+    async def load():
+      await asyncio.sleep(0.03)
+      return "rows"
+
+    leader = asyncio.create_task(flight.do("k", load))
+    await asyncio.sleep(0)
+    waiter = asyncio.create_task(flight.do("k", load))
+    await asyncio.sleep(0.01)
+    waiter.cancel()
+    self.assertEqual(await leader, ("rows", False))
+    with self.assertRaises(asyncio.CancelledError):
+      await waiter
+
+  def test_separate_event_loops(self):
+    """Loops in different threads never await each other's futures.
+    """
+    flight, results = AsyncSingleFlight(), []
+
+    async def load():
+      await asyncio.sleep(0.02)
+      return "rows"
+
+    def run():
+      results.append(asyncio.run(flight.do("k", load)))
+
+    threads = [threading.Thread(target=run) for _ in range(3)]
+    for thread in threads:
+      thread.start()
+    for thread in threads:
+      thread.join()
+    self.assertEqual(results, [("rows", False)] * 3)
+
+
+class TestCacheQueryDecorator(ClockTestCase):
+  """Test cases for cache_query with a real sqlite database.
+  """
+
+  def setUp(self):
+    super().setUp()
+    self.con = sqlite3.connect(":memory:", check_same_thread=False)
+    self.con.execute("CREATE TABLE users (id INTEGER PRIMARY KEY, email TEXT)")
+    self.con.execute("CREATE TABLE orders (id INTEGER PRIMARY KEY)")
+    self.con.executemany("INSERT INTO users (email) VALUES (?)", [("a@x",), ("b@x",)])
+    self.calls = 0
+    quiet = contextlib.redirect_stdout(io.StringIO())
+    quiet.__enter__()
+    self.addCleanup(quiet.__exit__, None, None, None)
+
+  def decorate(self, **options):
+    @cache_query(**options)
+    def fetch(con, query, params=()):
+      self.calls += 1
+      return con.execute(query, params).fetchall()
+    return fetch
+
+  def test_hits_and_normalized_keys(self):
+    """Variants of one query and equal parameters hit the same entry.
+    """
+    fetch = self.decorate()
+    fetch(self.con, "SELECT * FROM users WHERE id = ?", (1,))
+    fetch(self.con, "select *  from users where id = ?", (1,))
+    fetch(self.con, "SELECT * FROM users WHERE id = ?", (2,))
+    self.assertEqual(self.calls, 2)
+    self.assertEqual(fetch.cache_info().hits, 1)
+
+  def test_publish_invalidates_decorated_cache(self):
+    """A published write to a table the query read forces a re-query.
+    """
+    fetch = self.decorate()
+    fetch(self.con, "SELECT * FROM users, sqlite_master")
+    publish_writes(tables_written("UPDATE users SET email = 'c@x'"))
+    fetch(self.con, "SELECT * FROM users, sqlite_master")
+    self.assertEqual(self.calls, 2)
+
+  def test_refresh_ahead_requires_connect(self):
+    """refresh_ahead without a connect callable is rejected.
+    """
+    with self.assertRaises(ValueError):
+      self.decorate(refresh_ahead=0.5)
+
+  def test_transactional_commit_invalidates(self):
+    """A committed @transactional UPDATE drops cached reads of that table, and only those.
+    """
+    @transactional
+    def update_email(con, user_id, email):
+      con.execute("UPDATE users SET email = ? WHERE id = ?", (email, user_id))
+
+    @transactional
+    def add_order(con):
+      con.execute("INSERT INTO orders DEFAULT VALUES")
+
+    fetch = self.decorate()
+    query = "SELECT * FROM (SELECT email FROM users) t"
+    fetch(self.con, query)
+    add_order(self.con)
+    fetch(self.con, query)
+    self.assertEqual(self.calls, 1)
+    update_email(self.con, 1, "zzz@x")
+    self.assertEqual(fetch(self.con, query), [("zzz@x",), ("b@x",)])
+    self.assertEqual(self.calls, 2)
+
+  def test_refresh_ahead_serves_cached_value_and_refreshes(self):
+    """Past the refresh point the cached value is returned and re-queried in the background.
+    """
+    refreshed = threading.Event()
+    fetch = self.decorate(ttl=10, refresh_ahead=0.5,
+                          connect=lambda: _Unclosable(self.con, refreshed))
+    first = fetch(self.con, "SELECT COUNT(*) FROM users")
+    self.con.execute("INSERT INTO users (email) VALUES ('c@x')")
+    self.clock.now += 6
+    self.assertEqual(fetch(self.con, "SELECT COUNT(*) FROM users"), first)
+    self.assertTrue(refreshed.wait(5))
+    self.assertEqual(self.calls, 2)
+    self.assertEqual(fetch(self.con, "SELECT COUNT(*) FROM users"), [(3,)])
+
+
+class _Unclosable:
+  """Shares the test's in-memory connection with the refresh worker and
+  sets `closed` once the refresh is done with it.
+  """
+
+  def __init__(self, con, closed):
+    self.con = con
+    self.closed = closed
+
+  def execute(self, *args):
+    return self.con.execute(*args)
+
+  def close(self):
+    self.closed.set()
+
+
+if __name__ == "__main__":
+  unittest.main()
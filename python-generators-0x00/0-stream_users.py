@@ -1,31 +1,188 @@
-import mysql.connector
 from mysql.connector import Error
 import os
-from dotenv import load_dotenv
+import sys
+import time
+from db import connect
+from filters import plan
+from prefetch import prefetched
+from queries import USER_FIELDS, USER_QUERY
+from resumable import checkpointed, resumable_batches, resume_point
+from rows import make_row
 
-load_dotenv()
 
+class StreamStats:
+    """
+    Counters filled in by stream_users() while it runs. peak_buffered_rows
+    is the most rows held client-side at once (current window plus any
+    prefetched ones), sampled each time a window is handed over.
+    bytes_received is read from the server's session counter once the
+    result set has been read to the end, so it stays 0 when the consumer
+    stops early (the unread result blocks the query) and for resumable
+    scans, which run one query per window.
+    """
 
-def stream_users():
+    def __init__(self):
+        self.rows = 0
+        self.bytes_received = 0
+        self.peak_buffered_rows = 0
+        self.elapsed = 0.0
+
+    @property
+    def rows_per_sec(self):
+        return self.rows / self.elapsed if self.elapsed else 0.0
+
+    def __repr__(self):
+        return (f"StreamStats(rows={self.rows}, rows_per_sec={self.rows_per_sec:,.0f}, "
+                f"bytes_received={self.bytes_received}, "
+                f"peak_buffered_rows={self.peak_buffered_rows})")
+
+
+def _bytes_sent_by_server(cursor):
+    """Session counter of bytes the server has sent to this client."""
+    cursor.execute("SHOW SESSION STATUS LIKE 'Bytes_sent'")
+    return int(cursor.fetchone()[1])
+
+
+def _unbuffered_windows(fetch_size, clause, params, stats):
+    """
+    Yields fetchmany() windows from a single unbuffered query. The
+    connection is opened and closed by this generator.
+    """
+    connection = connect()
+    cursor = None
+    finished = False
+    try:
+        cursor = connection.cursor(buffered=False)
+        if stats is not None:
+            bytes_before = _bytes_sent_by_server(cursor)
+        cursor.execute(f"{USER_QUERY} WHERE {clause}" if clause else USER_QUERY, params)
+        while True:
+            window = cursor.fetchmany(fetch_size)
+            if not window:
+                break
+            yield window
+        finished = True
+        if stats is not None:
+            stats.bytes_received = _bytes_sent_by_server(cursor) - bytes_before
+    finally:
+        if cursor and finished:
+            cursor.close()
+        # If the consumer stopped early the result is still unread; the
+        # pool then closes the connection instead of draining the rows.
+        connection.close()
+
+
+def _counted(windows, fetched):
+    """Passes windows through, adding each one's row count to fetched[0]."""
     try:
-        connection = mysql.connector.connect(
-            host=os.getenv("DB_HOST"),
-            user=os.getenv("DB_USER"),
-            password=os.getenv("DB_PASSWORD"),
-            database="ALX_prodev"
-        )
-        cursor = connection.cursor()
-        cursor.execute("SELECT user_id, name, email, CAST(age AS UNSIGNED) AS age FROM user_data")
-
-        for row in cursor:
-            yield row
+        for window in windows:
+            fetched[0] += len(window)
+            yield window
+    finally:
+        windows.close()
+
+
+def stream_users(fetch_size=1000, stats=None, where=None, pushdown=True, prefetch=0,
+                 resume_from=None, checkpoint=None, row_factory=None,
+                 max_reconnects=5, backoff=1.0, max_backoff=60.0):
+    """
+    Generator that streams users one row at a time from an unbuffered
+    cursor, so the server result set is read off the socket in windows of
+    at most fetch_size rows and never materialised client-side.
+    If a StreamStats is passed it is updated as rows are consumed.
+    `where` is a filters.Predicate pushed down into SQL where possible.
+    With prefetch=N, up to N windows are fetched ahead on a background
+    thread while the consumer works through the current one.
+
+    Passing resume_from (a user_id or resumable.Checkpoint) or checkpoint
+    switches to a resumable scan: rows come in user_id order, the
+    checkpoint tracks the last key handed out, and dropped connections are
+    re-opened and continued from that key, waiting backoff, 2 * backoff,
+    ... seconds (capped at max_backoff) for up to max_reconnects failures
+    in a row (None: no limit).
+    row_factory (e.g. rows.UserRow) converts each row before it is yielded.
+    """
+    clause, params, residual = plan(where, pushdown)
+    resumable = resume_from is not None or checkpoint is not None
+    resume_from, checkpoint = resume_point(resume_from, checkpoint)
+    if resumable:
+        windows = resumable_batches(connect, fetch_size, resume_from, None,
+                                    clause, params, dictionary=False,
+                                    max_reconnects=max_reconnects, backoff=backoff,
+                                    max_backoff=max_backoff)
+    else:
+        windows = _unbuffered_windows(fetch_size, clause, params, stats)
+    # Rows read off the socket so far; counted where they are fetched (on
+    # the prefetch thread, if any) so queued windows are included.
+    fetched = [0]
+    if stats is not None:
+        windows = _counted(windows, fetched)
+    if prefetch:
+        windows = prefetched(windows, prefetch)
+    if checkpoint is not None:
+        # Advanced here, after a window's rows were yielded, not by the
+        # (possibly prefetching) producer.
+        windows = checkpointed(windows, checkpoint, dictionary=False)
+    start = time.perf_counter()
+    consumed = 0
+    try:
+        for window in windows:
+            if stats is not None:
+                # Current window plus whatever is queued or in flight behind it.
+                buffered = fetched[0] - consumed
+                stats.peak_buffered_rows = max(stats.peak_buffered_rows, buffered)
+                consumed += len(window)
+            for row in window:
+                if stats is not None:
+                    stats.rows += 1
+                    stats.elapsed = time.perf_counter() - start
+                if residual is not None and not residual(dict(zip(USER_FIELDS, row))):
+                    continue
+                yield make_row(row_factory, row)
     except Error as e:
         print(f"Error: {e}")
     finally:
-        if connection:
-            cursor.close()
-            connection.close()
+        # Stops any prefetch thread, then closes the cursor and connection.
+        windows.close()
+
+
+def check_flat_rss(sample_every=1_000_000, max_growth_mb=64):
+    """
+    Streams the whole table, printing RSS samples, and returns False if RSS
+    ever grew more than max_growth_mb past its level after the first row
+    (connection and first window allocated), i.e. if memory did not stay flat.
+    """
+    page_size = os.sysconf("SC_PAGE_SIZE")
+
+    def rss_mb():
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1]) * page_size / 2 ** 20
+
+    stats = StreamStats()
+    baseline = peak = None
+    for _ in stream_users(stats=stats):
+        if baseline is None:
+            baseline = peak = rss_mb()
+            print(f"baseline RSS {baseline:.1f} MiB")
+        elif stats.rows % sample_every == 0:
+            peak = max(peak, rss_mb())
+            print(f"{stats.rows:>12} rows  RSS {rss_mb():.1f} MiB")
+    if baseline is None:
+        print("user_data is empty; nothing to check.")
+        return True
+    final = rss_mb()
+    growth = max(peak, final) - baseline
+    print(f"final RSS {final:.1f} MiB (baseline {baseline:.1f} MiB)")
+    print(stats)
+    if growth > max_growth_mb:
+        print(f"FAIL: RSS grew {growth:.1f} MiB (limit {max_growth_mb} MiB)")
+        return False
+    print(f"OK: RSS grew {growth:.1f} MiB (limit {max_growth_mb} MiB)")
+    return True
+
 
 if __name__ == "__main__":
+    if "--check-rss" in sys.argv:
+        sys.exit(0 if check_flat_rss() else 1)
     for user in stream_users():
         print(user)
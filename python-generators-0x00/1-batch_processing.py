@@ -1,54 +1,172 @@
-import mysql.connector
 from mysql.connector import Error
-import os
-from dotenv import load_dotenv
+import sys
+import time
+import tracemalloc
+from db import connect
+from filters import Field, plan
+from prefetch import prefetched
+from queries import USER_FIELDS, USER_QUERY
+from resumable import checkpointed, resumable_batches, resume_point
+from rows import make_row
 
-# Load environment variables
-load_dotenv()
+try:
+    import numpy as np
+except ImportError:  # columnar mode is optional
+    np = None
 
 
-def stream_users_in_batches(batch_size):
+def stream_batches(batch_size, dictionary=True, where=None, pushdown=True,
+                   resume_from=None, checkpoint=None, resumable=False,
+                   max_reconnects=5, backoff=1.0, max_backoff=60.0):
     """
-    Generator that streams rows from 'users' table in batches.
-    Each row is yielded one by one to save memory.
+    Generator that yields the raw fetchmany() batches from 'user_data':
+    lists of dicts (or of tuples with dictionary=False).
+    `where` is a filters.Predicate; the parts that compile to SQL are sent
+    as a parameterized WHERE clause (unless pushdown=False) and the rest
+    is applied to each fetched row.
+    resume_from / checkpoint (or resumable=True) switch to a resumable,
+    reconnecting scan in user_id order (see resumable.resumable_batches,
+    which takes max_reconnects, backoff and max_backoff).
     """
+    clause, params, residual = plan(where, pushdown)
+    if resumable or resume_from is not None or checkpoint is not None:
+        batches = resumable_batches(connect, batch_size, resume_from, checkpoint,
+                                    clause, params, dictionary,
+                                    max_reconnects, backoff, max_backoff)
+    else:
+        batches = _query_batches(batch_size, dictionary, clause, params)
+    try:
+        for batch in batches:
+            if residual is not None:
+                batch = [row for row in batch
+                         if residual(row if dictionary else dict(zip(USER_FIELDS, row)))]
+                if not batch:
+                    continue
+            yield batch
+    except Error as e:
+        print(f"Error: {e}")
+        return None
+    finally:
+        batches.close()
+
+
+def _query_batches(batch_size, dictionary, clause, params):
+    """Yields fetchmany() batches of a single query over one connection."""
+    connection = connect()
     try:
-        connection = mysql.connector.connect(
-            host=os.getenv("DB_HOST"),
-            user=os.getenv("DB_USER"),
-            password=os.getenv("DB_PASSWORD"),
-            database="ALX_prodev"
-        )
-        cursor = connection.cursor(dictionary=True)
-        cursor.execute("SELECT user_id, name, email, CAST(age AS UNSIGNED) AS age FROM user_data")
+        cursor = connection.cursor(dictionary=dictionary)
+        cursor.execute(f"{USER_QUERY} WHERE {clause}" if clause else USER_QUERY, params)
 
         while True:
             batch = cursor.fetchmany(batch_size)
             if not batch:
                 break
-            for row in batch:
-                yield row
-
-    except Error as e:
-        print(f"Error: {e}")
-        return None
+            yield batch
     finally:
-        if connection:
-            cursor.close()
-            connection.close()
+        connection.close()
+
+
+def stream_users_in_batches(batch_size, where=None, pushdown=True, prefetch=0,
+                            resume_from=None, checkpoint=None, row_factory=None,
+                            max_reconnects=5, backoff=1.0, max_backoff=60.0):
+    """
+    Generator that streams rows from 'users' table in batches.
+    Each row is yielded one by one to save memory.
+    With prefetch=N, up to N batches are fetched ahead on a background
+    thread while the current one is consumed. resume_from / checkpoint
+    make the scan resumable (see stream_batches, which also takes the
+    max_reconnects / backoff / max_backoff retry budget). row_factory (e.g.
+    rows.UserRow) converts each row before it is yielded.
+    """
+    resumable = resume_from is not None or checkpoint is not None
+    resume_from, checkpoint = resume_point(resume_from, checkpoint)
+    batches = stream_batches(batch_size, where=where, pushdown=pushdown,
+                             resume_from=resume_from, resumable=resumable,
+                             max_reconnects=max_reconnects, backoff=backoff,
+                             max_backoff=max_backoff)
+    if prefetch:
+        batches = prefetched(batches, prefetch)
+    if checkpoint is not None:
+        # Advanced on the consumer side, so prefetched batches are not covered.
+        batches = checkpointed(batches, checkpoint)
+    for batch in batches:
+        for row in batch:
+            yield make_row(row_factory, row)
 
 
-def batch_processing(batch_size):
+def batch_processing(batch_size, pushdown=True):
     """
     Processes users in batches and yields only those over age 25.
+    The age filter runs in SQL, so younger users never leave the database.
     """
-    for user in stream_users_in_batches(batch_size):
-        if user["age"] > 25:
-            yield user
+    yield from stream_users_in_batches(batch_size, where=Field("age") > 25, pushdown=pushdown)
+
+
+def to_columns(batch):
+    """Turns a list of (user_id, name, email, age) tuples into column arrays."""
+    user_ids, names, emails, ages = zip(*batch)
+    return {
+        "user_id": np.array(user_ids, dtype="U36"),
+        "name": np.array(names, dtype=object),
+        "email": np.array(emails, dtype=object),
+        "age": np.array(ages, dtype=np.uint16),
+    }
+
+
+def stream_users_columnar(batch_size, where=None, pushdown=True, prefetch=0):
+    """
+    Generator that yields each batch as a dict of NumPy column arrays
+    instead of flattening it into one dict per row. Requires numpy.
+    """
+    if np is None:
+        raise ImportError("numpy is required for columnar batches: pip install numpy")
+    batches = stream_batches(batch_size, dictionary=False, where=where, pushdown=pushdown)
+    if prefetch:
+        batches = prefetched(batches, prefetch)
+    for batch in batches:
+        yield to_columns(batch)
+
+
+def batch_processing_columnar(batch_size):
+    """
+    Columnar batch_processing(): yields each batch reduced to users over
+    age 25 with a vectorized mask.
+    """
+    for columns in stream_users_columnar(batch_size):
+        mask = columns["age"] > 25
+        if mask.any():
+            yield {name: values[mask] for name, values in columns.items()}
+
+
+def benchmark_batches(batch_size=10000):
+    """Compares throughput and peak Python memory of the dict and columnar paths."""
+    def dict_path():
+        return sum(1 for _ in batch_processing(batch_size, pushdown=False))
+
+    def pushdown_path():
+        return sum(1 for _ in batch_processing(batch_size))
+
+    def columnar_path():
+        return sum(len(columns["age"]) for columns in batch_processing_columnar(batch_size))
+
+    for label, run in (("dict", dict_path), ("pushdown", pushdown_path),
+                       ("columnar", columnar_path)):
+        tracemalloc.start()
+        start = time.perf_counter()
+        matched = run()
+        elapsed = time.perf_counter() - start
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        print(f"{label:>9}: {matched} users over 25 in {elapsed:.2f}s "
+              f"({matched / elapsed if elapsed else 0:,.0f} rows/sec), "
+              f"peak traced memory {peak / 2 ** 20:.1f} MiB")
 
 
 # Run when script is executed directly
 if __name__ == "__main__":
+    if "--benchmark" in sys.argv:
+        benchmark_batches()
+        sys.exit(0)
     print("Users over 25:\n")
     for user in batch_processing(batch_size=10):
         print(user)
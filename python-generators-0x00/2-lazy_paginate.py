@@ -1,24 +1,21 @@
-import mysql.connector
 from mysql.connector import Error
-import os
-from dotenv import load_dotenv
+import sys
+import time
+from db import connect
+from filters import plan
+from queries import USER_QUERY, fetch_after
+from rows import make_row
 
-# Load environment variables
-load_dotenv()
 
-
-def paginate_users(page_size, offset):
+def paginate_users(page_size, offset, row_factory=None):
     """
     Generator that streams rows from 'users' table in pages.
     Each row is yielded one by one to save memory.
+    row_factory (e.g. rows.UserRow) converts each row before it is yielded.
     """
+    connection = None
     try:
-        connection = mysql.connector.connect(
-            host=os.getenv("DB_HOST"),
-            user=os.getenv("DB_USER"),
-            password=os.getenv("DB_PASSWORD"),
-            database="ALX_prodev"
-        )
+        connection = connect()
         cursor = connection.cursor(dictionary=True)
         cursor.execute(f"SELECT * FROM user_data LIMIT {page_size} OFFSET {offset}")
 
@@ -27,31 +24,118 @@ def paginate_users(page_size, offset):
             if not page:
                 break
             for row in page:
-                yield row
+                yield make_row(row_factory, row)
 
     except Error as e:
         print(f"Error: {e}")
         return None
     finally:
         if connection:
-            cursor.close()
             connection.close()
 
 
-def lazypaginate(page_size):
+def fetch_page_after(connection, page_size, last_seen=None, clause=None, params=()):
+    """
+    Returns the next page of at most page_size users ordered by user_id,
+    starting strictly after last_seen (keyset / seek pagination). The
+    primary key index is used to seek, so every page costs the same no
+    matter how deep into the table it is. `clause`/`params` add an extra
+    SQL filter (see filters.plan).
+    """
+    return fetch_after(connection, page_size, last_seen, clause, params)
+
+
+def lazypaginate(page_size, last_seen=None, where=None, pushdown=True, row_factory=None):
+    """
+    Lazily yields pages (lists of user dicts) over a single connection
+    using keyset pagination. Rows inserted while paginating never shift
+    the pages already served, because each page resumes after the last
+    user_id seen rather than at a row offset. `where` is a
+    filters.Predicate; a residual Python-only filter can make pages short.
+    row_factory (e.g. rows.UserRow) converts the rows of each page.
+    """
+    clause, params, residual = plan(where, pushdown)
+    try:
+        connection = connect()
+    except Error as e:
+        print(f"Error: {e}")
+        return
+    try:
+        while True:
+            page = fetch_page_after(connection, page_size, last_seen, clause, params)
+            if not page:
+                break
+            last_seen = page[-1]["user_id"]
+            full = len(page) == page_size
+            if residual is not None:
+                page = [row for row in page if residual(row)]
+            if page:
+                yield [make_row(row_factory, row) for row in page] if row_factory else page
+            if not full:
+                break
+    except Error as e:
+        print(f"Error: {e}")
+    finally:
+        connection.close()
+
+
+def benchmark_pagination(page_size=1000):
     """
-    Processes users in pages and yields only those over age 25.
+    Times a full scan with LIMIT/OFFSET against keyset pagination, both on
+    one connection. OFFSET pages get slower the deeper they go (quadratic
+    total), keyset pages stay flat (linear total).
     """
-    offset = 0
-    while True:
-        page = paginate_users(page_size, offset)
-        if not page:
-            break
-        yield page
-        offset += page_size
-    
+    connection = connect()
+    try:
+        cursor = connection.cursor()
+        cursor.execute("SELECT COUNT(*) FROM user_data")
+        total = cursor.fetchone()[0]
+        cursor.close()
+        print(f"Scanning {total} rows with page_size={page_size}")
+
+        def offset_pages():
+            offset = 0
+            while True:
+                cur = connection.cursor(dictionary=True)
+                cur.execute(
+                    f"{USER_QUERY} ORDER BY user_id LIMIT %s OFFSET %s",
+                    (page_size, offset)
+                )
+                page = cur.fetchall()
+                cur.close()
+                if not page:
+                    return
+                yield page
+                offset += page_size
+
+        def keyset_pages():
+            last_seen = None
+            while True:
+                page = fetch_page_after(connection, page_size, last_seen)
+                if not page:
+                    return
+                yield page
+                last_seen = page[-1]["user_id"]
+
+        for label, pages in (("offset", offset_pages()), ("keyset", keyset_pages())):
+            timings = []
+            start = time.perf_counter()
+            for _ in pages:
+                now = time.perf_counter()
+                timings.append(now - start)
+                start = now
+            tail = timings[-max(len(timings) // 10, 1):] if timings else [0]
+            print(f"{label:>7}: {sum(timings):8.2f}s total, {len(timings)} pages, "
+                  f"first page {timings[0] if timings else 0:.4f}s, "
+                  f"last 10% avg {sum(tail) / len(tail):.4f}s/page")
+    finally:
+        connection.close()
+
 
 if __name__ == "__main__":
+    if "--benchmark" in sys.argv:
+        benchmark_pagination()
+        sys.exit(0)
     for page in lazypaginate(page_size=3):
         for user in page:
             print(f"  - {user['name']} {user['email']}, age {user['age']})")
@@ -1,36 +1,122 @@
-import mysql.connector
+import random
+import sys
+from collections import namedtuple
+from statistics import NormalDist
+
+from db import connect
+from parallel_scan import parallel_stats
+from stream_stats import StreamingStats
 
 # Generator that streams user ages one by one
 def stream_user_ages():
-    connection = mysql.connector.connect(
-        host="localhost",
-        user="root",
-        password="yourpassword",
-        database="yourdatabase"
-    )
-    cursor = connection.cursor()
-    cursor.execute("SELECT age FROM user_data")
+    connection = connect()
+    try:
+        cursor = connection.cursor()
+        cursor.execute("SELECT age FROM user_data")
 
-    # Yield each age one by one without loading all into memory
-    for (age,) in cursor:
-        yield age
+        # Yield each age one by one without loading all into memory
+        for (age,) in cursor:
+            yield age
 
-    cursor.close()
-    conn.close()
+        cursor.close()
+    finally:
+        connection.close()
 
 
 # Function to calculate the average using at most two loops
 def calculate_average_age():
-    total = 0
-    count = 0
+    stats = StreamingStats.from_iterable(stream_user_ages(), lower=0, upper=120, buckets=12)
+    average = stats.mean if stats.count else 0
+    print(f"Average age of users: {average:.2f}")
+    return stats
 
-    for age in stream_user_ages():
-        total += age
-        count += 1
 
-    average = total / count if count else 0
-    print(f"Average age of users: {average:.2f}")
+def calculate_average_age_parallel(partitions=8, workers=4, mode="thread"):
+    """
+    Same aggregate as calculate_average_age(), computed per user_id range
+    on `workers` connections and merged.
+    """
+    stats = parallel_stats("age", partitions, workers, mode, lower=0, upper=120, buckets=12)
+    print(f"Average age of users: {stats.mean if stats.count else 0:.2f}")
+    return stats
+
+
+AgeEstimate = namedtuple("AgeEstimate", "mean low high confidence rows blocks stats")
+
+
+def _sample_block(cursor, start, block_size):
+    """Ages of the block_size users whose user_id follows `start`."""
+    cursor.execute(
+        "SELECT age FROM user_data WHERE user_id >= %s ORDER BY user_id LIMIT %s",
+        (start, block_size)
+    )
+    return [age for (age,) in cursor.fetchall()]
+
+
+def estimate_average_age(error=0.5, confidence=0.95, block_size=100, min_blocks=10,
+                         max_blocks=10_000, seed=None):
+    """
+    Approximate average age from random user_id key ranges.
+
+    Each sample is a block of consecutive keys starting at a random uuid
+    prefix (one primary-key range read), so the cost depends on the
+    requested precision, not the table size. Sampling stops as soon as
+    the confidence interval half-width, taken over block means, is at
+    most `error` years, or after max_blocks blocks.
+    """
+    rng = random.Random(seed)
+    z = NormalDist().inv_cdf((1 + confidence) / 2)
+    stats = StreamingStats(lower=0, upper=120, buckets=12)
+    block_means = StreamingStats()
+    half_width = float("inf")
+
+    connection = connect()
+    try:
+        cursor = connection.cursor()
+        while block_means.count < max_blocks:
+            ages = _sample_block(cursor, f"{rng.getrandbits(32):08x}", block_size)
+            if not ages:
+                # Started past the last key: wrap around to the first one.
+                ages = _sample_block(cursor, "", block_size)
+                if not ages:
+                    break
+            for age in ages:
+                stats.update(age)
+            block_means.update(sum(ages) / len(ages))
+            if block_means.count >= min_blocks:
+                half_width = z * (block_means.sample_variance / block_means.count) ** 0.5
+                if half_width <= error:
+                    break
+        cursor.close()
+    finally:
+        connection.close()
+
+    if not stats.count:
+        print("No users found.")
+        return AgeEstimate(0.0, 0.0, 0.0, confidence, 0, 0, stats)
+    estimate = AgeEstimate(stats.mean, stats.mean - half_width, stats.mean + half_width,
+                           confidence, stats.count, block_means.count, stats)
+    print(f"Average age of users: {estimate.mean:.2f} "
+          f"(±{half_width:.2f}, {confidence:.0%} CI, {stats.count} sampled rows)")
+    return estimate
+
+
+def print_age_summary(stats):
+    """Prints the one-pass aggregate collected by calculate_average_age()."""
+    if not stats.count:
+        return
+    print(f"Users: {stats.count}  min {stats.min:.0f}  max {stats.max:.0f}  "
+          f"stddev {stats.stddev:.2f}")
+    print(f"p50 {stats.quantile(0.5):.0f}  p90 {stats.quantile(0.9):.0f}  "
+          f"p99 {stats.quantile(0.99):.0f}")
+    for (low, high), count in zip(stats.bucket_edges(), stats.histogram):
+        print(f"  {low:>5.0f}-{high:<5.0f} {count}")
 
 
 if __name__ == "__main__":
-    calculate_average_age()
+    if "--approx" in sys.argv:
+        estimate_average_age()
+    elif "--parallel" in sys.argv:
+        print_age_summary(calculate_average_age_parallel())
+    else:
+        print_age_summary(calculate_average_age())
@@ -0,0 +1,113 @@
+"""
+Async-generator versions of the streaming readers.
+
+These mirror stream_users, stream_users_in_batches, lazypaginate and
+stream_user_ages with the same batch semantics, but run on aiosqlite
+against a local copy of user_data (DB_PATH, as in
+python-context-async-perations-0x02), so `async for` consumers do not
+block the event loop while rows are fetched.
+"""
+import asyncio
+import os
+
+import aiosqlite
+
+DB_PATH = os.getenv("DB_PATH", "ALX_prodev.db")
+
+USER_QUERY = "SELECT user_id, name, email, CAST(age AS INTEGER) AS age FROM user_data"
+
+
+async def async_stream_users(fetch_size=1000, db_path=DB_PATH):
+    """Yields users one (user_id, name, email, age) tuple at a time."""
+    async with aiosqlite.connect(db_path) as db:
+        async with db.execute(USER_QUERY) as cursor:
+            while True:
+                window = await cursor.fetchmany(fetch_size)
+                if not window:
+                    break
+                for row in window:
+                    yield tuple(row)
+
+
+async def async_stream_users_in_batches(batch_size, db_path=DB_PATH):
+    """Fetches batch_size rows per round-trip and yields them one dict at a time."""
+    async with aiosqlite.connect(db_path) as db:
+        db.row_factory = aiosqlite.Row
+        async with db.execute(USER_QUERY) as cursor:
+            while True:
+                batch = await cursor.fetchmany(batch_size)
+                if not batch:
+                    break
+                for row in batch:
+                    yield dict(row)
+
+
+async def async_batch_processing(batch_size, db_path=DB_PATH):
+    """Yields users over age 25; the filter runs in SQL."""
+    async with aiosqlite.connect(db_path) as db:
+        db.row_factory = aiosqlite.Row
+        async with db.execute(f"{USER_QUERY} WHERE age > ?", (25,)) as cursor:
+            while True:
+                batch = await cursor.fetchmany(batch_size)
+                if not batch:
+                    break
+                for row in batch:
+                    yield dict(row)
+
+
+async def async_lazypaginate(page_size, last_seen=None, db_path=DB_PATH):
+    """Yields pages (lists of dicts) with keyset pagination over one connection."""
+    async with aiosqlite.connect(db_path) as db:
+        db.row_factory = aiosqlite.Row
+        while True:
+            if last_seen is None:
+                query, params = f"{USER_QUERY} ORDER BY user_id LIMIT ?", (page_size,)
+            else:
+                query = f"{USER_QUERY} WHERE user_id > ? ORDER BY user_id LIMIT ?"
+                params = (last_seen, page_size)
+            async with db.execute(query, params) as cursor:
+                page = [dict(row) for row in await cursor.fetchall()]
+            if not page:
+                break
+            yield page
+            if len(page) < page_size:
+                break
+            last_seen = page[-1]["user_id"]
+
+
+async def async_stream_user_ages(fetch_size=1000, db_path=DB_PATH):
+    """Yields each user's age."""
+    async with aiosqlite.connect(db_path) as db:
+        async with db.execute("SELECT age FROM user_data") as cursor:
+            while True:
+                window = await cursor.fetchmany(fetch_size)
+                if not window:
+                    break
+                for (age,) in window:
+                    yield age
+
+
+async def async_calculate_average_age(db_path=DB_PATH):
+    total = 0
+    count = 0
+    async for age in async_stream_user_ages(db_path=db_path):
+        total += age
+        count += 1
+    average = total / count if count else 0
+    print(f"Average age of users: {average:.2f}")
+    return average
+
+
+async def main():
+    # Page through users while the average is computed concurrently
+    async def print_pages():
+        async for page in async_lazypaginate(page_size=3):
+            for user in page:
+                print(f"  - {user['name']} {user['email']}, age {user['age']}")
+            print("-" * 40)
+
+    await asyncio.gather(print_pages(), async_calculate_average_age())
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,224 @@
+"""
+Benchmark harness for the python-generators-0x00 strategies.
+
+Seeds a scratch MySQL database (ALX_prodev_bench by default, never the
+real ALX_prodev) with synthetic users at each requested size, then runs
+every strategy in a fresh process and records:
+
+    rows/sec, time to first row, peak RSS and server query count
+
+Results are printed as a table and written as JSON so runs can be
+compared over time.
+
+    python benchmark.py --sizes 10000 1000000 10000000 --json bench.json
+
+--seed-workers instead loads one synthetic CSV with seed.parallel_seed()
+at each worker count and reports write throughput per count:
+
+    python benchmark.py --sizes 1000000 --seed-workers 1 2 4 8
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import resource
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from queue import Empty
+
+DEFAULT_DATABASE = "ALX_prodev_bench"
+
+
+def _strategies():
+    """name -> zero-argument callable returning an iterable of rows (or pages)."""
+    stream_users = __import__('0-stream_users').stream_users
+    batching = __import__('1-batch_processing')
+    lazypaginate = __import__('2-lazy_paginate').lazypaginate
+    stream_user_ages = __import__('4-stream_ages').stream_user_ages
+    from parallel_scan import parallel_scan, uuid_ranges
+
+    return {
+        "stream_users": lambda: stream_users(),
+        "stream_users_prefetch": lambda: stream_users(prefetch=2),
+        "batch_processing_python": lambda: batching.batch_processing(1000, pushdown=False),
+        "batch_processing_pushdown": lambda: batching.batch_processing(1000),
+        "stream_users_in_batches": lambda: batching.stream_users_in_batches(1000),
+        "lazypaginate": lambda: (row for page in lazypaginate(1000) for row in page),
+        "stream_user_ages": lambda: stream_user_ages(),
+        "parallel_scan_4": lambda: parallel_scan(uuid_ranges(8), workers=4),
+    }
+
+
+def _run_strategy(name, results):
+    """Child process: consumes one strategy and reports its measurements."""
+    strategy = _strategies()[name]
+    start = time.perf_counter()
+    first_row = None
+    rows = 0
+    for _ in strategy():
+        if first_row is None:
+            first_row = time.perf_counter() - start
+        rows += 1
+    elapsed = time.perf_counter() - start
+    peak_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if sys.platform == "darwin":
+        peak_kb //= 1024  # macOS reports bytes
+    results.put({
+        "rows": rows,
+        "seconds": elapsed,
+        "rows_per_sec": rows / elapsed if elapsed else 0.0,
+        "time_to_first_row": first_row,
+        "peak_rss_mb": peak_kb / 1024,
+    })
+
+
+def _wait_for_result(worker, results):
+    while True:
+        try:
+            return results.get(timeout=1)
+        except Empty:
+            if not worker.is_alive():
+                raise RuntimeError(f"benchmark worker exited with code {worker.exitcode}")
+
+
+def _questions(connection):
+    """Server-wide count of statements executed so far."""
+    cursor = connection.cursor()
+    cursor.execute("SHOW GLOBAL STATUS LIKE 'Questions'")
+    value = int(cursor.fetchone()[1])
+    cursor.close()
+    return value
+
+
+def seed_table(rows, batch_size=20_000, seed=0):
+    """Recreates user_data in the benchmark database with `rows` synthetic users."""
+    import seed as seeder
+    from synthetic import generate_users
+
+    server = seeder.connect_db()
+    cursor = server.cursor()
+    cursor.execute(f"CREATE DATABASE IF NOT EXISTS `{os.environ['DB_NAME']}`")
+    cursor.close()
+    server.close()
+
+    connection = seeder.connect_to_prodev()
+    seeder.create_table(connection)
+    cursor = connection.cursor()
+    cursor.execute("TRUNCATE TABLE user_data")
+    cursor.close()
+    seeder.load_batches(connection, generate_users(rows, batch_size, seed))
+    connection.close()
+
+
+def run_benchmarks(sizes, strategies=None, reseed=True):
+    """Seeds each size, runs each strategy in its own process, returns result dicts."""
+    from db import connect
+
+    names = strategies or list(_strategies())
+    context = multiprocessing.get_context("spawn")
+    results = []
+    for size in sizes:
+        if reseed:
+            print(f"Seeding {size} rows...")
+            seed_table(size)
+        print(HEADER)
+        monitor = connect()
+        try:
+            for name in names:
+                queue = context.Queue()
+                before = _questions(monitor)
+                worker = context.Process(target=_run_strategy, args=(name, queue))
+                worker.start()
+                record = _wait_for_result(worker, queue)
+                worker.join()
+                # Excludes the monitor's own second SHOW STATUS.
+                record["queries"] = _questions(monitor) - before - 1
+                record.update(strategy=name, table_rows=size)
+                results.append(record)
+                print_row(record)
+        finally:
+            monitor.close()
+    return results
+
+
+def sweep_seed_workers(rows, worker_counts, batch_size=1000, seed=0):
+    """
+    Writes `rows` synthetic users to a CSV once, then seeds the emptied
+    table from it with parallel_seed() at each worker count and returns
+    one result dict (rows/sec) per count.
+    """
+    import seed as seeder
+    from synthetic import generate_users, write_csv
+
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "user_data.csv")
+        write_csv(path, generate_users(rows, seed=seed))
+        print(SWEEP_HEADER)
+        for workers in worker_counts:
+            seed_table(0)  # empty table, same schema
+            start = time.perf_counter()
+            inserted, _ = seeder.parallel_seed(path, workers, batch_size)
+            elapsed = time.perf_counter() - start
+            record = {
+                "strategy": "parallel_seed",
+                "workers": workers,
+                "table_rows": rows,
+                "rows": inserted,
+                "seconds": elapsed,
+                "rows_per_sec": inserted / elapsed if elapsed else 0.0,
+            }
+            results.append(record)
+            print(f"{workers:>8}{inserted:>12,}{elapsed:>10.2f}{record['rows_per_sec']:>14,.0f}")
+    return results
+
+
+SWEEP_HEADER = f"{'workers':>8}{'rows':>12}{'seconds':>10}{'rows/sec':>14}"
+
+HEADER = (f"{'strategy':<28}{'table rows':>12}{'rows/sec':>14}"
+          f"{'first row s':>13}{'peak RSS MB':>13}{'queries':>10}")
+
+
+def print_row(record):
+    ttfr = record["time_to_first_row"]
+    print(f"{record['strategy']:<28}{record['table_rows']:>12,}"
+          f"{record['rows_per_sec']:>14,.0f}"
+          f"{(f'{ttfr:.4f}' if ttfr is not None else '-'):>13}"
+          f"{record['peak_rss_mb']:>13.1f}{record['queries']:>10}")
+
+
+def write_json(path, results, database):
+    payload = {
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "database": database,
+        "results": results,
+    }
+    with open(path, "w") as file:
+        json.dump(payload, file, indent=2)
+    print(f"Results written to '{path}'.")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the generator strategies.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 1_000_000])
+    parser.add_argument("--strategies", nargs="+", help="subset of strategies to run")
+    parser.add_argument("--database", default=DEFAULT_DATABASE,
+                        help="scratch database that is seeded and truncated")
+    parser.add_argument("--no-reseed", action="store_true",
+                        help="reuse the existing table (single size only)")
+    parser.add_argument("--seed-workers", type=int, nargs="+", metavar="N",
+                        help="measure seeding throughput at these worker counts instead")
+    parser.add_argument("--json", default="bench_results.json")
+    args = parser.parse_args()
+
+    # Must be set before db.py creates its pool; child processes inherit it.
+    os.environ["DB_NAME"] = args.database
+    if args.seed_workers:
+        results = sweep_seed_workers(args.sizes[0], args.seed_workers)
+    else:
+        results = run_benchmarks(args.sizes, args.strategies, reseed=not args.no_reseed)
+    write_json(args.json, results, args.database)
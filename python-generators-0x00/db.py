@@ -0,0 +1,173 @@
+"""
+Shared connection provider for the generator modules.
+
+Every script gets its ALX_prodev connections from `connect()`, which
+hands out connections from a process-wide pool instead of opening a new
+one each time. The pool is bounded (max_size), closes connections that
+sat idle longer than idle_timeout, and pings an idle connection before
+reusing it. Calling `close()` on a pooled connection returns it to the
+pool; connections that are broken or still have unread results are
+closed instead (without reading the rest of the result set).
+
+Settings come from the environment (.env):
+    DB_HOST, DB_USER, DB_PASSWORD, DB_NAME (default ALX_prodev),
+    DB_POOL_SIZE (default 8), DB_POOL_IDLE_TIMEOUT (seconds, default 300)
+"""
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+import mysql.connector
+from mysql.connector import errors
+from dotenv import load_dotenv
+
+load_dotenv()
+
+
+class PooledConnection:
+    """Proxy for a pooled connection; close() gives it back to the pool."""
+
+    def __init__(self, pool, raw):
+        self._pool = pool
+        self._raw = raw
+
+    def __getattr__(self, name):
+        raw = self.__dict__.get("_raw")
+        if raw is None:
+            raise errors.InterfaceError("connection already returned to the pool")
+        return getattr(raw, name)
+
+    def close(self):
+        raw, self._raw = self._raw, None
+        if raw is not None:
+            self._pool.release(raw)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+class ConnectionPool:
+    def __init__(self, max_size=8, idle_timeout=300, acquire_timeout=30, **connect_kwargs):
+        self.max_size = max_size
+        self.idle_timeout = idle_timeout
+        self.acquire_timeout = acquire_timeout
+        self.connect_kwargs = connect_kwargs
+        self._idle = []  # (raw connection, released_at), most recent last
+        self._slots = threading.BoundedSemaphore(max_size)
+        self._lock = threading.Lock()
+        self.opened = 0
+        self.reused = 0
+
+    def acquire(self):
+        """Returns a PooledConnection, blocking while max_size are in use."""
+        if not self._slots.acquire(timeout=self.acquire_timeout):
+            raise errors.PoolError(f"no free connection after {self.acquire_timeout}s")
+        try:
+            raw = self._take_idle()
+            if raw is None:
+                raw = mysql.connector.connect(**self.connect_kwargs)
+                self.opened += 1
+            else:
+                self.reused += 1
+        except BaseException:
+            self._slots.release()
+            raise
+        return PooledConnection(self, raw)
+
+    def _take_idle(self):
+        """Pops the freshest idle connection that is not expired and answers a ping."""
+        now = time.monotonic()
+        while True:
+            with self._lock:
+                if not self._idle:
+                    return None
+                raw, released_at = self._idle.pop()
+                expired = [conn for conn, at in self._idle if now - at > self.idle_timeout]
+                self._idle = [(conn, at) for conn, at in self._idle
+                              if now - at <= self.idle_timeout]
+            for conn in expired:
+                close_quietly(conn)
+            if now - released_at > self.idle_timeout:
+                close_quietly(raw)
+                continue
+            try:
+                raw.ping(reconnect=False)
+                return raw
+            except errors.Error:
+                close_quietly(raw)
+
+    def release(self, raw):
+        """
+        Ends any open transaction and keeps the connection for reuse. A
+        connection with an unread result (a streaming consumer that stopped
+        early) is closed instead: rollback() would first make the driver
+        read every remaining row of that result.
+        """
+        try:
+            if raw.unread_result:
+                close_quietly(raw)
+                return
+            raw.rollback()
+        except errors.Error:
+            # Broken, or an unbuffered result was abandoned mid-stream.
+            close_quietly(raw)
+        else:
+            with self._lock:
+                self._idle.append((raw, time.monotonic()))
+        finally:
+            self._slots.release()
+
+    @contextmanager
+    def connection(self):
+        conn = self.acquire()
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    def close_all(self):
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for raw, _ in idle:
+            close_quietly(raw)
+
+
+def close_quietly(raw):
+    """Closes a connection, ignoring errors from one that is already broken."""
+    if raw is None:
+        return
+    try:
+        raw.close()
+    except errors.Error:
+        pass
+
+
+_pool = None
+_pool_pid = None
+_pool_lock = threading.Lock()
+
+
+def get_pool():
+    """The process-wide pool (re-created after fork, since sockets can't be shared)."""
+    global _pool, _pool_pid
+    with _pool_lock:
+        if _pool is None or _pool_pid != os.getpid():
+            _pool = ConnectionPool(
+                max_size=int(os.getenv("DB_POOL_SIZE", "8")),
+                idle_timeout=float(os.getenv("DB_POOL_IDLE_TIMEOUT", "300")),
+                host=os.getenv("DB_HOST"),
+                user=os.getenv("DB_USER"),
+                password=os.getenv("DB_PASSWORD"),
+                database=os.getenv("DB_NAME", "ALX_prodev"),
+            )
+            _pool_pid = os.getpid()
+        return _pool
+
+
+def connect():
+    """Borrows a connection to the ALX_prodev database; close() returns it."""
+    return get_pool().acquire()
@@ -0,0 +1,186 @@
+"""
+Chunked export of user_data for analytics.
+
+Batches come from the batch generator in 1-batch_processing.py and are
+fetched ahead on a background thread while the current batch is being
+encoded. Output is split into files of at most `rows_per_file` rows:
+
+    parquet / arrow   when pyarrow is installed (zstd-compressed)
+    ndjson / csv      gzip'd, always available
+
+Memory use is bounded by batch_size * (prefetch + 1) rows.
+
+    python export_users.py exports/ --format auto --rows-per-file 1000000
+"""
+import argparse
+import csv
+import gzip
+import json
+import os
+import time
+
+from prefetch import prefetched
+from queries import USER_FIELDS
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # columnar formats are optional
+    pa = pq = None
+
+stream_batches = __import__('1-batch_processing').stream_batches
+
+EXTENSIONS = {
+    "parquet": "parquet",
+    "arrow": "arrow",
+    "ndjson": "ndjson.gz",
+    "csv": "csv.gz",
+}
+
+
+class NdjsonWriter:
+    def __init__(self, path):
+        self.file = gzip.open(path, "wt", encoding="utf-8")
+
+    def write(self, rows):
+        self.file.write("".join(
+            json.dumps(dict(zip(USER_FIELDS, row)), default=str) + "\n" for row in rows
+        ))
+
+    def close(self):
+        self.file.close()
+
+
+class CsvWriter:
+    def __init__(self, path):
+        self.file = gzip.open(path, "wt", encoding="utf-8", newline="")
+        self.writer = csv.writer(self.file)
+        self.writer.writerow(USER_FIELDS)
+
+    def write(self, rows):
+        self.writer.writerows(rows)
+
+    def close(self):
+        self.file.close()
+
+
+def _arrow_schema():
+    return pa.schema([
+        ("user_id", pa.string()),
+        ("name", pa.string()),
+        ("email", pa.string()),
+        ("age", pa.uint16()),
+    ])
+
+
+def _arrow_table(rows, schema):
+    columns = list(zip(*rows))
+    return pa.Table.from_arrays(
+        [pa.array(column, type=field.type) for column, field in zip(columns, schema)],
+        schema=schema,
+    )
+
+
+class ParquetWriter:
+    def __init__(self, path):
+        self.schema = _arrow_schema()
+        self.writer = pq.ParquetWriter(path, self.schema, compression="zstd")
+
+    def write(self, rows):
+        # Each batch becomes one row group.
+        if rows:
+            self.writer.write_table(_arrow_table(rows, self.schema))
+
+    def close(self):
+        self.writer.close()
+
+
+class ArrowWriter:
+    def __init__(self, path):
+        self.schema = _arrow_schema()
+        self.sink = pa.OSFile(path, "wb")
+        options = pa.ipc.IpcWriteOptions(compression="zstd")
+        self.writer = pa.ipc.new_file(self.sink, self.schema, options=options)
+
+    def write(self, rows):
+        if rows:
+            self.writer.write_table(_arrow_table(rows, self.schema))
+
+    def close(self):
+        self.writer.close()
+        self.sink.close()
+
+
+WRITERS = {
+    "parquet": ParquetWriter,
+    "arrow": ArrowWriter,
+    "ndjson": NdjsonWriter,
+    "csv": CsvWriter,
+}
+
+
+def resolve_format(fmt):
+    """'auto' picks parquet when pyarrow is available, gzip'd NDJSON otherwise."""
+    if fmt == "auto":
+        return "parquet" if pa is not None else "ndjson"
+    if fmt not in WRITERS:
+        raise ValueError(f"unknown export format {fmt!r}")
+    if fmt in ("parquet", "arrow") and pa is None:
+        raise ImportError(f"pyarrow is required for {fmt} export: pip install pyarrow")
+    return fmt
+
+
+def export_user_data(out_dir, fmt="auto", rows_per_file=1_000_000, batch_size=10_000,
+                     prefetch=2, where=None, prefix="user_data"):
+    """
+    Writes user_data to `out_dir` in files of at most rows_per_file rows
+    and returns the list of paths written.
+    """
+    if rows_per_file < 1:
+        raise ValueError("rows_per_file must be at least 1")
+    fmt = resolve_format(fmt)
+    os.makedirs(out_dir, exist_ok=True)
+    batches = stream_batches(batch_size, dictionary=False, where=where)
+    if prefetch:
+        batches = prefetched(batches, prefetch)
+
+    paths, writer = [], None
+    in_file = total = 0
+    start = time.perf_counter()
+    try:
+        for batch in batches:
+            while batch:
+                if writer is None:
+                    path = os.path.join(out_dir, f"{prefix}-{len(paths):05d}.{EXTENSIONS[fmt]}")
+                    writer = WRITERS[fmt](path)
+                    paths.append(path)
+                    in_file = 0
+                room = rows_per_file - in_file
+                chunk, batch = batch[:room], batch[room:]
+                writer.write(chunk)
+                in_file += len(chunk)
+                total += len(chunk)
+                if in_file >= rows_per_file:
+                    writer.close()
+                    writer = None
+    finally:
+        if writer is not None:
+            writer.close()
+        batches.close()
+    elapsed = time.perf_counter() - start
+    rate = total / elapsed if elapsed else 0
+    print(f"Exported {total} rows to {len(paths)} {fmt} file(s) in {elapsed:.2f}s "
+          f"({rate:,.0f} rows/sec).")
+    return paths
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export user_data in chunked files.")
+    parser.add_argument("out_dir")
+    parser.add_argument("--format", default="auto", choices=["auto", *WRITERS])
+    parser.add_argument("--rows-per-file", type=int, default=1_000_000)
+    parser.add_argument("--batch-size", type=int, default=10_000)
+    parser.add_argument("--prefetch", type=int, default=2)
+    args = parser.parse_args()
+    export_user_data(args.out_dir, args.format, args.rows_per_file,
+                     args.batch_size, args.prefetch)
@@ -0,0 +1,208 @@
+"""
+Small filter-expression API for the generator modules.
+
+    >>> predicate = (Field("age") > 25) & (Field("email") != "")
+    >>> predicate.to_sql()
+    ('(`age` > %s AND `email` <> %s)', [25, ''])
+    >>> predicate({"age": 30, "email": "a@b.c"})
+    True
+
+Predicates compile to a parameterized SQL WHERE clause so only matching
+rows leave the database. Anything that cannot be expressed in SQL (a
+`Where(callable)`) is evaluated in Python instead; `plan()` splits an
+expression into the part that can be pushed down and the residual.
+"""
+import operator
+import re
+
+_IDENTIFIER = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*$")
+
+_OPERATORS = {
+    ">": operator.gt,
+    ">=": operator.ge,
+    "<": operator.lt,
+    "<=": operator.le,
+    "=": operator.eq,
+    "<>": operator.ne,
+}
+
+
+def _value(row, name):
+    """Reads a column from a dict row or an attribute-style row object."""
+    if isinstance(row, dict):
+        return row[name]
+    return getattr(row, name)
+
+
+class Predicate:
+    """Base class: combine with &, | and ~."""
+
+    def to_sql(self):
+        """Returns (clause, params), or None if this cannot run in SQL."""
+        raise NotImplementedError
+
+    def __call__(self, row):
+        raise NotImplementedError
+
+    def __and__(self, other):
+        return And(self, other)
+
+    def __or__(self, other):
+        return Or(self, other)
+
+    def __invert__(self):
+        return Not(self)
+
+
+class Comparison(Predicate):
+    def __init__(self, field, op, value):
+        self.field = field
+        self.op = op
+        self.value = value
+
+    def to_sql(self):
+        return f"`{self.field}` {self.op} %s", [self.value]
+
+    def __call__(self, row):
+        return _OPERATORS[self.op](_value(row, self.field), self.value)
+
+    def __repr__(self):
+        return f"Field({self.field!r}) {self.op} {self.value!r}"
+
+
+class In(Predicate):
+    def __init__(self, field, values):
+        self.field = field
+        self.values = list(values)
+
+    def to_sql(self):
+        if not self.values:
+            return "1 = 0", []
+        placeholders = ", ".join(["%s"] * len(self.values))
+        return f"`{self.field}` IN ({placeholders})", list(self.values)
+
+    def __call__(self, row):
+        return _value(row, self.field) in self.values
+
+
+class And(Predicate):
+    def __init__(self, *parts):
+        # Flatten nested ANDs so plan() can push down each conjunct.
+        self.parts = tuple(
+            sub for part in parts
+            for sub in (part.parts if isinstance(part, And) else (part,))
+        )
+
+    def to_sql(self):
+        return _join(self.parts, " AND ")
+
+    def __call__(self, row):
+        return all(part(row) for part in self.parts)
+
+
+class Or(Predicate):
+    def __init__(self, *parts):
+        self.parts = parts
+
+    def to_sql(self):
+        return _join(self.parts, " OR ")
+
+    def __call__(self, row):
+        return any(part(row) for part in self.parts)
+
+
+class Not(Predicate):
+    def __init__(self, part):
+        self.part = part
+
+    def to_sql(self):
+        compiled = self.part.to_sql()
+        if compiled is None:
+            return None
+        clause, params = compiled
+        return f"NOT ({clause})", params
+
+    def __call__(self, row):
+        return not self.part(row)
+
+
+class Where(Predicate):
+    """Arbitrary Python predicate; never pushed down to SQL."""
+
+    def __init__(self, func):
+        self.func = func
+
+    def to_sql(self):
+        return None
+
+    def __call__(self, row):
+        return bool(self.func(row))
+
+
+def _join(parts, separator):
+    clauses, params = [], []
+    for part in parts:
+        compiled = part.to_sql()
+        if compiled is None:
+            return None
+        clauses.append(compiled[0])
+        params.extend(compiled[1])
+    return "(" + separator.join(clauses) + ")", params
+
+
+class Field:
+    """Column reference; comparison operators build Predicates."""
+
+    __hash__ = None
+
+    def __init__(self, name):
+        if not _IDENTIFIER.match(name):
+            raise ValueError(f"invalid column name {name!r}")
+        self.name = name
+
+    def __gt__(self, value):
+        return Comparison(self.name, ">", value)
+
+    def __ge__(self, value):
+        return Comparison(self.name, ">=", value)
+
+    def __lt__(self, value):
+        return Comparison(self.name, "<", value)
+
+    def __le__(self, value):
+        return Comparison(self.name, "<=", value)
+
+    def __eq__(self, value):
+        return Comparison(self.name, "=", value)
+
+    def __ne__(self, value):
+        return Comparison(self.name, "<>", value)
+
+    def is_in(self, values):
+        return In(self.name, values)
+
+
+def plan(predicate, pushdown=True):
+    """
+    Splits a predicate into (sql_clause, params, residual).
+
+    sql_clause/params go into the WHERE clause (None/[] if nothing can be
+    pushed down); residual is a Python predicate still to be applied to
+    each row, or None. With pushdown=False everything stays in Python.
+    """
+    if predicate is None:
+        return None, [], None
+    if not pushdown:
+        return None, [], predicate
+    compiled = predicate.to_sql()
+    if compiled is not None:
+        return compiled[0], compiled[1], None
+    if isinstance(predicate, And):
+        pushed, residual = [], []
+        for part in predicate.parts:
+            (pushed if part.to_sql() is not None else residual).append(part)
+        if pushed:
+            clause, params = And(*pushed).to_sql()
+            rest = residual[0] if len(residual) == 1 else And(*residual)
+            return clause, params, rest
+    return None, [], predicate
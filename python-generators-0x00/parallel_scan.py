@@ -0,0 +1,166 @@
+"""
+Range-partitioned parallel scans of user_data.
+
+The key space is split into ranges `(after, upto]` on user_id and each
+range is streamed on its own connection by a worker. Rows can come back
+unordered (as soon as any worker has a batch) or merged in user_id order.
+Aggregates run one partial per range in a thread or process pool and the
+partials are combined, e.g. StreamingStats.merge().
+"""
+import queue
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from functools import partial, reduce
+
+from db import connect
+from filters import Field, plan
+from prefetch import DONE, put_until_stopped
+from queries import USER_FIELDS
+from resumable import resumable_batches
+from stream_stats import StreamingStats
+
+
+def uuid_ranges(partitions):
+    """
+    Splits the user_id space into equal ranges by hex prefix. uuid4 and
+    uuid5 keys are uniformly distributed, so no sampling is needed.
+    """
+    bounds = [f"{(i << 32) // partitions:08x}" for i in range(1, partitions)]
+    return list(zip([None] + bounds, bounds + [None]))
+
+
+def sampled_ranges(connection, partitions, sample_rate=0.001):
+    """
+    Picks range boundaries from a random sample of keys, for key columns
+    that are not uniformly distributed. Falls back to uuid_ranges().
+    """
+    cursor = connection.cursor()
+    try:
+        cursor.execute(
+            "SELECT user_id FROM user_data WHERE RAND() < %s ORDER BY user_id",
+            (sample_rate,)
+        )
+        sample = [key for (key,) in cursor.fetchall()]
+    finally:
+        cursor.close()
+    if len(sample) < partitions:
+        return uuid_ranges(partitions)
+    bounds = sorted({sample[len(sample) * i // partitions] for i in range(1, partitions)})
+    return list(zip([None] + bounds, bounds + [None]))
+
+
+def scan_range(bounds, batch_size=1000, clause=None, params=(), dictionary=True,
+               connect=connect):
+    """Yields batches for user_id in (after, upto] over one reconnecting connection."""
+    after, upto = bounds
+    conditions, values = [], []
+    if upto is not None:
+        conditions.append("user_id <= %s")
+        values.append(upto)
+    if clause:
+        conditions.append(clause)
+        values.extend(params)
+    return resumable_batches(connect, batch_size, resume_from=after,
+                             clause=" AND ".join(conditions) or None,
+                             params=values, dictionary=dictionary)
+
+
+def _run_partition(scan, out, stop, tag):
+    """Worker: pushes (tag, batch) items, then (tag, DONE) or (tag, exception)."""
+    def put(item):
+        return put_until_stopped(out, item, stop)
+
+    try:
+        for batch in scan:
+            if not put((tag, batch)):
+                return
+        put((tag, DONE))
+    except BaseException as e:
+        put((tag, e))
+    finally:
+        scan.close()
+
+
+def parallel_scan(ranges, workers=4, batch_size=1000, where=None, ordered=False,
+                  dictionary=True, connect=connect):
+    """
+    Generator that streams the rows of every range using `workers`
+    threads, each range on its own connection. With ordered=False rows are
+    yielded as batches arrive; with ordered=True they are yielded in
+    user_id order (ranges are disjoint and sorted, so this is a merge by
+    concatenation while later ranges are fetched ahead).
+    """
+    clause, params, residual = plan(where)
+    stop = threading.Event()
+    if ordered:
+        queues = [queue.Queue(maxsize=2) for _ in ranges]
+    else:
+        shared = queue.Queue(maxsize=2 * workers)
+        queues = [shared] * len(ranges)
+    executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="scan")
+    try:
+        for tag, bounds in enumerate(ranges):
+            scan = scan_range(bounds, batch_size, clause, params, dictionary, connect)
+            executor.submit(_run_partition, scan, queues[tag], stop, tag)
+        pending = len(ranges)
+        current = 0
+        while pending:
+            tag, item = queues[current].get()
+            if item is DONE:
+                pending -= 1
+                if ordered:
+                    current += 1
+                continue
+            if isinstance(item, BaseException):
+                raise item
+            for row in item:
+                if residual is None or residual(
+                        row if dictionary else dict(zip(USER_FIELDS, row))):
+                    yield row
+    finally:
+        stop.set()
+        executor.shutdown(wait=True, cancel_futures=True)
+
+
+def range_stats(bounds, column="age", stats_options=None, connect=connect):
+    """Partial aggregate: StreamingStats of `column` over one key range."""
+    after, upto = bounds
+    conditions, values = [], []
+    if after is not None:
+        conditions.append("user_id > %s")
+        values.append(after)
+    if upto is not None:
+        conditions.append("user_id <= %s")
+        values.append(upto)
+    where = f" WHERE {' AND '.join(conditions)}" if conditions else ""
+    stats = StreamingStats(**(stats_options or {}))
+    connection = connect()
+    try:
+        cursor = connection.cursor()
+        cursor.execute(f"SELECT `{Field(column).name}` FROM user_data{where}", values)
+        for (value,) in cursor:
+            stats.update(value)
+        cursor.close()
+    finally:
+        connection.close()
+    return stats
+
+
+def parallel_aggregate(ranges, partial_func, combine=None, workers=4, mode="thread"):
+    """
+    Runs partial_func(bounds) for every range in a thread or process pool
+    and folds the partial results with combine(a, b) (default: a.merge(b)).
+    In process mode partial_func must be picklable (a module-level function
+    or functools.partial of one).
+    """
+    combine = combine or (lambda a, b: a.merge(b))
+    pool = ProcessPoolExecutor if mode == "process" else ThreadPoolExecutor
+    with pool(max_workers=workers) as executor:
+        partials = list(executor.map(partial_func, ranges))
+    return reduce(combine, partials)
+
+
+def parallel_stats(column="age", partitions=8, workers=4, mode="thread", **stats_options):
+    """StreamingStats of a numeric column computed over `partitions` key ranges."""
+    func = partial(range_stats, column=column, stats_options=stats_options)
+    return parallel_aggregate(uuid_ranges(partitions), func, workers=workers, mode=mode)
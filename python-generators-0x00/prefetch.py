@@ -0,0 +1,75 @@
+"""
+Double-buffered prefetching for the batch generators.
+
+prefetched(source, depth) runs `source` on a background thread and keeps
+at most `depth` items waiting in a bounded queue, so the next fetchmany()
+round-trip overlaps with the consumer's work on the current batch while
+a slow consumer still applies backpressure to the database.
+"""
+import queue
+import threading
+
+# End-of-stream marker put on a queue by a producer thread.
+DONE = object()
+
+
+def put_until_stopped(buffer, item, stop):
+    """
+    Puts `item` on the bounded queue `buffer`, waiting for room until the
+    event `stop` is set. Returns False if it was stopped first, so a
+    producer never blocks forever on a consumer that has gone away.
+    """
+    while not stop.is_set():
+        try:
+            buffer.put(item, timeout=0.1)
+            return True
+        except queue.Full:
+            continue
+    return False
+
+
+def prefetched(source, depth=2):
+    """
+    Generator that yields the items of `source`, fetched ahead on a
+    background thread. Exceptions raised by `source` are re-raised in the
+    consumer. If the consumer stops early (break/close), the worker stops
+    and `source` is closed on the worker thread, so a generator's own
+    cleanup (closing cursors and connections) runs where it was opened.
+    """
+    if depth < 1:
+        raise ValueError("depth must be at least 1")
+    buffer = queue.Queue(maxsize=depth)
+    stop = threading.Event()
+
+    def put(item):
+        return put_until_stopped(buffer, item, stop)
+
+    def produce():
+        iterator = iter(source)
+        try:
+            for item in iterator:
+                if not put((True, item)):
+                    break
+            else:
+                put(DONE)
+        except BaseException as e:
+            put((False, e))
+        finally:
+            close = getattr(iterator, "close", None)
+            if close is not None:
+                close()
+
+    worker = threading.Thread(target=produce, name="prefetch", daemon=True)
+    worker.start()
+    try:
+        while True:
+            item = buffer.get()
+            if item is DONE:
+                return
+            ok, value = item
+            if not ok:
+                raise value
+            yield value
+    finally:
+        stop.set()
+        worker.join()
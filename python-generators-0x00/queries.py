@@ -0,0 +1,33 @@
+"""
+Shared user_data column list and keyset query for the generator modules.
+
+USER_FIELDS is the column order of every tuple row; USER_QUERY selects
+those columns (age as an integer). fetch_after() is the one keyset
+("seek") query used by keyset pagination and resumable scans.
+"""
+USER_FIELDS = ("user_id", "name", "email", "age")
+USER_COLUMNS = "user_id, name, email, CAST(age AS UNSIGNED) AS age"
+USER_QUERY = f"SELECT {USER_COLUMNS} FROM user_data"
+
+
+def fetch_after(connection, limit, last_key=None, clause=None, params=(), dictionary=True):
+    """
+    Returns at most `limit` users ordered by user_id, starting strictly
+    after last_key. The primary key index is used to seek, so every call
+    costs the same no matter how deep into the table it starts.
+    `clause`/`params` add an extra SQL filter (see filters.plan).
+    """
+    conditions, values = [], []
+    if last_key is not None:
+        conditions.append("user_id > %s")
+        values.append(last_key)
+    if clause:
+        conditions.append(clause)
+        values.extend(params)
+    where = f" WHERE {' AND '.join(conditions)}" if conditions else ""
+    cursor = connection.cursor(dictionary=dictionary)
+    try:
+        cursor.execute(f"{USER_QUERY}{where} ORDER BY user_id LIMIT %s", (*values, limit))
+        return cursor.fetchall()
+    finally:
+        cursor.close()
@@ -0,0 +1,146 @@
+"""
+Checkpointable, self-reconnecting scans of user_data.
+
+A resumable scan walks the table in user_id order with keyset queries
+(`WHERE user_id > last_key ORDER BY user_id LIMIT n`), so the last key
+seen is a complete cursor token: persist it with a Checkpoint and pass
+it back as `resume_from` to continue where the scan stopped. Lost
+connections are re-opened with exponential back-off and the scan carries
+on from the same token instead of restarting at row zero.
+"""
+import json
+import os
+import time
+
+from mysql.connector import errors
+
+from db import close_quietly
+from queries import fetch_after
+
+# Errors raised when the server goes away or cannot be reached.
+CONNECTION_ERRORS = (errors.OperationalError, errors.InterfaceError)
+
+
+class Checkpoint:
+    """
+    Holds the last user_id handed to the consumer. With a path, every
+    advance() is written to a small JSON file (atomically, via rename).
+    """
+
+    def __init__(self, path=None, last_key=None):
+        self.path = path
+        self.last_key = last_key
+
+    @classmethod
+    def load(cls, path):
+        """Reads a saved checkpoint, or starts a new one if the file is missing."""
+        try:
+            with open(path) as file:
+                return cls(path, json.load(file).get("last_key"))
+        except FileNotFoundError:
+            return cls(path)
+
+    @property
+    def token(self):
+        return self.last_key
+
+    def advance(self, key):
+        self.last_key = key
+        if self.path:
+            self.save()
+
+    def save(self):
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w") as file:
+            json.dump({"last_key": self.last_key}, file)
+        os.replace(tmp_path, self.path)
+
+
+def resume_point(resume_from=None, checkpoint=None):
+    """
+    Normalizes the resume arguments to (start_key, checkpoint): resume_from
+    may be a key or a Checkpoint, and a checkpoint alone resumes from its
+    own token.
+    """
+    if isinstance(resume_from, Checkpoint):
+        return resume_from.token, checkpoint or resume_from
+    if resume_from is None and checkpoint is not None:
+        return checkpoint.token, checkpoint
+    return resume_from, checkpoint
+
+
+def checkpointed(batches, checkpoint, dictionary=True):
+    """
+    Yields `batches` unchanged and advances `checkpoint` to a batch's last
+    user_id once the consumer asks for the next batch. Wrap the consumer
+    end of a pipeline with it (after any prefetched() stage), so the
+    checkpoint never covers rows the consumer has not been handed yet.
+    """
+    try:
+        for batch in batches:
+            yield batch
+            last_row = batch[-1]
+            checkpoint.advance(last_row["user_id"] if dictionary else last_row[0])
+    finally:
+        close = getattr(batches, "close", None)
+        if close is not None:
+            close()
+
+
+def resumable_batches(connect, batch_size, resume_from=None, checkpoint=None,
+                      clause=None, params=(), dictionary=True,
+                      max_reconnects=5, backoff=1.0, max_backoff=60.0):
+    """
+    Generator that yields batches of users in user_id order, one keyset
+    query per batch, reconnecting after connection errors.
+
+    resume_from is a key or a Checkpoint; scanning starts strictly after
+    it. The checkpoint advances to a batch's last key once the consumer
+    asks for the next batch, so delivery is at-least-once: after a crash
+    at most the batch being processed is delivered again. When the batches
+    are prefetched on another thread, leave checkpoint out here and wrap
+    the consumer side with checkpointed() instead.
+
+    After a connection error the scan waits backoff, 2 * backoff, ...
+    seconds (at most max_backoff) and gives up after max_reconnects
+    failures in a row; max_reconnects=None keeps retrying, e.g. to outlast
+    a database restart during a long export.
+    """
+    resume_from, checkpoint = resume_point(resume_from, checkpoint)
+    if checkpoint is not None:
+        yield from checkpointed(
+            resumable_batches(connect, batch_size, resume_from, None, clause, params,
+                              dictionary, max_reconnects, backoff, max_backoff),
+            checkpoint, dictionary)
+        return
+    last_key = resume_from
+    failures = 0
+    connection = None
+    try:
+        while True:
+            try:
+                if connection is None:
+                    connection = connect()
+                batch = fetch_after(connection, batch_size, last_key,
+                                    clause, params, dictionary)
+                failures = 0
+            except CONNECTION_ERRORS as e:
+                failures += 1
+                if max_reconnects is not None and failures > max_reconnects:
+                    raise
+                delay = min(backoff * 2 ** min(failures - 1, 32), max_backoff)
+                print(f"Connection lost ({e}); reconnecting in {delay:.1f}s "
+                      f"from key {last_key!r}")
+                close_quietly(connection)
+                connection = None
+                time.sleep(delay)
+                continue
+            if not batch:
+                return
+            yield batch
+            last_row = batch[-1]
+            last_key = last_row["user_id"] if dictionary else last_row[0]
+            if len(batch) < batch_size:
+                return
+    finally:
+        close_quietly(connection)
@@ -0,0 +1,130 @@
+"""
+Compact row representations for streamed users.
+
+The generators yield dicts or tuples by default. When millions of users
+are held in memory (e.g. for joins), pass `row_factory=UserRow` to
+stream_users, stream_users_in_batches or paginate_users to get
+`__slots__` objects instead, or collect rows into a UserRowStore, which
+keeps them column-wise in arrays.
+
+Run `python rows.py` for a bytes-per-row comparison.
+"""
+import sys
+import tracemalloc
+import uuid
+from array import array
+from collections import namedtuple
+
+from queries import USER_FIELDS
+
+UserTuple = namedtuple("UserTuple", USER_FIELDS)
+
+
+class UserRow:
+    """A user with attribute access and no per-instance __dict__."""
+
+    __slots__ = USER_FIELDS
+
+    def __init__(self, user_id, name, email, age):
+        self.user_id = user_id
+        self.name = name
+        self.email = email
+        self.age = age
+
+    @classmethod
+    def from_row(cls, row):
+        """Builds a UserRow from a dict row or a (user_id, name, email, age) sequence."""
+        if isinstance(row, dict):
+            return cls(row["user_id"], row["name"], row["email"], row["age"])
+        return cls(*row)
+
+    def as_dict(self):
+        return {field: getattr(self, field) for field in USER_FIELDS}
+
+    def __eq__(self, other):
+        if not isinstance(other, UserRow):
+            return NotImplemented
+        return all(getattr(self, f) == getattr(other, f) for f in USER_FIELDS)
+
+    def __repr__(self):
+        return (f"UserRow(user_id={self.user_id!r}, name={self.name!r}, "
+                f"email={self.email!r}, age={self.age!r})")
+
+
+def make_row(row_factory, row):
+    """Applies a row factory; UserRow (the class) is accepted as a factory."""
+    if row_factory is None:
+        return row
+    if row_factory is UserRow:
+        return UserRow.from_row(row)
+    return row_factory(row)
+
+
+class UserRowStore:
+    """
+    Array-backed collection of users: user ids packed as 16-byte UUIDs,
+    ages in an unsigned-short array, names and emails in plain lists.
+    Indexing returns a UserRow.
+    """
+
+    def __init__(self, rows=()):
+        self._ids = bytearray()
+        self._names = []
+        self._emails = []
+        self._ages = array("H")
+        for row in rows:
+            self.append(row)
+
+    def append(self, row):
+        if isinstance(row, dict):
+            row = tuple(row[field] for field in USER_FIELDS)
+        elif isinstance(row, UserRow):
+            row = (row.user_id, row.name, row.email, row.age)
+        user_id, name, email, age = row
+        self._ids += uuid.UUID(str(user_id)).bytes
+        self._names.append(name)
+        self._emails.append(email)
+        self._ages.append(int(age))
+
+    def __len__(self):
+        return len(self._ages)
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("UserRowStore index out of range")
+        raw_id = bytes(self._ids[index * 16:(index + 1) * 16])
+        return UserRow(str(uuid.UUID(bytes=raw_id)), self._names[index],
+                       self._emails[index], self._ages[index])
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield self[index]
+
+
+def _sample_rows(count):
+    for i in range(count):
+        yield (str(uuid.uuid4()), f"User {i}", f"user{i}@example.com", 18 + i % 60)
+
+
+def benchmark_memory(count=100_000):
+    """Prints the traced bytes per row for each representation."""
+    representations = {
+        "tuple": lambda rows: [row for row in rows],
+        "dict": lambda rows: [dict(zip(USER_FIELDS, row)) for row in rows],
+        "namedtuple": lambda rows: [UserTuple(*row) for row in rows],
+        "UserRow": lambda rows: [UserRow(*row) for row in rows],
+        "UserRowStore": lambda rows: UserRowStore(rows),
+    }
+    for label, build in representations.items():
+        tracemalloc.start()
+        kept = build(_sample_rows(count))
+        current, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        print(f"{label:>13}: {current / count:7.1f} bytes/row")
+        del kept
+
+
+if __name__ == "__main__":
+    benchmark_memory(int(sys.argv[1]) if len(sys.argv) > 1 else 100_000)
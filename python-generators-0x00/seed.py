@@ -2,8 +2,16 @@ import mysql.connector
 import uuid
 import csv
 import os
+import argparse
+import hashlib
+import io
+import time
+from multiprocessing import Pool
+from itertools import islice
 from dotenv import load_dotenv
 from mysql.connector import Error
+from db import connect
+from synthetic import AGE_DISTRIBUTIONS, generate_users, write_csv
 
 # Load environment variables from .env file (DB credentials, etc.)
 load_dotenv()
@@ -46,14 +54,9 @@ def create_database(connection):
 # 3️⃣ CONNECT TO THE 'ALX_prodev' DATABASE
 # -------------------------------------------------------------
 def connect_to_prodev():
-    """Connects directly to the ALX_prodev database."""
+    """Connects to the ALX_prodev database through the shared pool (db.py)."""
     try:
-        connection = mysql.connector.connect(
-            host=os.getenv("DB_HOST"),
-            user=os.getenv("DB_USER"),
-            password=os.getenv("DB_PASSWORD"),
-            database="ALX_prodev"
-        )
+        connection = connect()
         if connection.is_connected():
             print("Connected to 'ALX_prodev' database.")
             return connection
@@ -75,7 +78,10 @@ def create_table(connection):
             name VARCHAR(255) NOT NULL,
             email VARCHAR(255) NOT NULL,
             age DECIMAL(3, 0) NOT NULL,
-            INDEX (user_id)
+            updated_at TIMESTAMP(6) NOT NULL
+                DEFAULT CURRENT_TIMESTAMP(6) ON UPDATE CURRENT_TIMESTAMP(6),
+            INDEX (user_id),
+            INDEX idx_user_data_updated (updated_at, user_id)
         )
         """
         cursor.execute(create_table_query)
@@ -108,34 +114,449 @@ def insert_data(connection, data):
         cursor.close()
 
 
+# -------------------------------------------------------------
+# 5️⃣b BULK INSERT DATA IN BATCHES
+# -------------------------------------------------------------
+INSERT_QUERY = """
+INSERT INTO user_data (user_id, name, email, age)
+VALUES (%s, %s, %s, %s)
+"""
+
+
+def insert_batch(connection, batch):
+    """Inserts a list of records with one executemany() and one COMMIT."""
+    cursor = connection.cursor()
+    try:
+        cursor.executemany(INSERT_QUERY, batch)
+        connection.commit()
+        return len(batch)
+    except Error as e:
+        connection.rollback()
+        print(f"Error inserting batch of {len(batch)} rows: {e}")
+        return 0
+    finally:
+        cursor.close()
+
+
+def chunked(records, batch_size):
+    """Groups any iterable of records into lists of at most batch_size."""
+    iterator = iter(records)
+    while True:
+        batch = list(islice(iterator, batch_size))
+        if not batch:
+            return
+        yield batch
+
+
+def bulk_insert(connection, records, batch_size=1000):
+    """
+    Inserts records in batches of batch_size, one transaction per batch.
+    Nothing is printed per row; a throughput summary is printed at the end.
+    Returns the number of rows inserted.
+    """
+    return load_batches(connection, chunked(records, batch_size))
+
+
+def load_batches(connection, batches, delta=False):
+    """
+    Writes already-chunked batches (e.g. from stream_csv) and reports rows/sec.
+    With delta=True only new or changed rows are upserted (see upsert_changed).
+    Returns the number of rows written.
+    """
+    if delta and not ensure_delta_schema(connection):
+        print(DELTA_ABORTED)
+        return 0
+    write = upsert_changed if delta else insert_batch
+    written = scanned = 0
+    start = time.perf_counter()
+    for batch in batches:
+        scanned += len(batch)
+        written += write(connection, batch)
+    elapsed = time.perf_counter() - start
+    rate = scanned / elapsed if elapsed else 0
+    if delta:
+        print(f"Upserted {written} new or changed rows out of {scanned} "
+              f"in {elapsed:.2f}s ({rate:,.0f} rows/sec scanned).")
+    else:
+        print(f"Inserted {written} rows in {elapsed:.2f}s ({rate:,.0f} rows/sec).")
+    return written
+
+
+# -------------------------------------------------------------
+# 5️⃣c INCREMENTAL (DELTA) LOADING
+# -------------------------------------------------------------
+# Fixed namespace so the same email always maps to the same user_id
+USER_NAMESPACE = uuid.UUID("6f1c1f7e-3d4b-5a7c-9b51-2c0e4a1d8e90")
+
+UPSERT_QUERY = """
+INSERT INTO user_data (user_id, name, email, age, row_hash)
+VALUES (%s, %s, %s, %s, %s)
+ON DUPLICATE KEY UPDATE
+    name = VALUES(name), email = VALUES(email),
+    age = VALUES(age), row_hash = VALUES(row_hash)
+"""
+
+# Keeps the row with the smallest user_id for every email
+DEDUPE_QUERY = """
+DELETE duplicate FROM user_data AS duplicate
+JOIN user_data AS kept
+  ON duplicate.email = kept.email AND duplicate.user_id > kept.user_id
+"""
+
+DELTA_ABORTED = (
+    "Delta load aborted: user_data is missing row_hash or a unique email index.\n"
+    "If the index failed on duplicate emails, re-run with --dedupe or run:"
+    + DEDUPE_QUERY
+)
+
+
+def stable_user_id(email):
+    """Derives a deterministic UUID from the (case-insensitive) email."""
+    return str(uuid.uuid5(USER_NAMESPACE, email.strip().lower()))
+
+
+def row_hash(record):
+    """SHA-1 of a record's content columns (name, email, age)."""
+    _, name, email, age = record
+    return hashlib.sha1(f"{name}\x1f{email}\x1f{age}".encode('utf-8')).hexdigest()
+
+
+def _ensure_schema(connection, check_sql, name, alter_sql):
+    """
+    Runs alter_sql unless check_sql (a COUNT over information_schema for
+    user_data, parameterized by name) finds `name`. Returns True when the
+    column or index exists afterwards.
+    """
+    cursor = connection.cursor()
+    try:
+        cursor.execute(check_sql, (name,))
+        if not cursor.fetchone()[0]:
+            cursor.execute(alter_sql)
+            connection.commit()
+            print(f"'{name}' added to 'user_data'.")
+        return True
+    except Error as e:
+        print(f"Error adding {name}: {e}")
+        return False
+    finally:
+        cursor.close()
+
+
+def ensure_column(connection, column, alter_sql):
+    """Runs alter_sql if user_data has no column named `column` yet."""
+    return _ensure_schema(connection, """
+        SELECT COUNT(*) FROM information_schema.COLUMNS
+        WHERE TABLE_SCHEMA = DATABASE()
+          AND TABLE_NAME = 'user_data' AND COLUMN_NAME = %s
+        """, column, alter_sql)
+
+
+def ensure_index(connection, index, alter_sql):
+    """Runs alter_sql if user_data has no index named `index` yet."""
+    return _ensure_schema(connection, """
+        SELECT COUNT(*) FROM information_schema.STATISTICS
+        WHERE TABLE_SCHEMA = DATABASE()
+          AND TABLE_NAME = 'user_data' AND INDEX_NAME = %s
+        """, index, alter_sql)
+
+
+def ensure_row_hash_column(connection):
+    """Adds the row_hash column used for change detection if it is missing."""
+    return ensure_column(connection, "row_hash",
+                         "ALTER TABLE user_data ADD COLUMN row_hash CHAR(40) NULL")
+
+
+def ensure_delta_schema(connection):
+    """
+    Prepares user_data for delta loads: the row_hash column plus a UNIQUE
+    index on email. The index lets ON DUPLICATE KEY UPDATE match rows that
+    were seeded earlier with random user_ids, so a first --delta run over
+    an existing table updates them instead of inserting copies. It cannot
+    be added while the table holds duplicate emails (remove them first
+    with dedupe_emails); the error is printed and False returned.
+    """
+    return (ensure_row_hash_column(connection)
+            and ensure_index(connection, "uq_user_data_email",
+                             "ALTER TABLE user_data ADD UNIQUE INDEX uq_user_data_email (email)"))
+
+
+def dedupe_emails(connection):
+    """
+    Deletes all but one row (the smallest user_id) per email, e.g. the
+    copies left by re-running a plain seed. Returns rows deleted.
+    """
+    cursor = connection.cursor()
+    try:
+        cursor.execute(DEDUPE_QUERY)
+        deleted = cursor.rowcount
+        connection.commit()
+        print(f"Removed {deleted} duplicate rows from 'user_data'.")
+        return deleted
+    except Error as e:
+        connection.rollback()
+        print(f"Error removing duplicate emails: {e}")
+        return 0
+    finally:
+        cursor.close()
+
+
+def ensure_updated_at_column(connection):
+    """
+    Adds the indexed updated_at watermark column (used by tail_users.py)
+    to tables created before it was part of the schema.
+    """
+    ensure_column(connection, "updated_at", """
+        ALTER TABLE user_data
+        ADD COLUMN updated_at TIMESTAMP(6) NOT NULL
+            DEFAULT CURRENT_TIMESTAMP(6) ON UPDATE CURRENT_TIMESTAMP(6),
+        ADD INDEX idx_user_data_updated (updated_at, user_id)
+    """)
+
+
+def upsert_changed(connection, batch):
+    """
+    Looks up the stored hashes for the batch's emails and upserts only the
+    records that are new or whose content changed. Rows are matched by
+    email (see ensure_delta_schema), so existing rows keep their user_id.
+    Returns rows written.
+    """
+    hashed = {record[2]: (*record, row_hash(record)) for record in batch}
+    cursor = connection.cursor()
+    try:
+        placeholders = ", ".join(["%s"] * len(hashed))
+        cursor.execute(
+            f"SELECT email, row_hash FROM user_data WHERE email IN ({placeholders})",
+            list(hashed),
+        )
+        stored = dict(cursor.fetchall())
+        changed = [row for key, row in hashed.items() if stored.get(key) != row[4]]
+        if changed:
+            cursor.executemany(UPSERT_QUERY, changed)
+            connection.commit()
+        return len(changed)
+    except Error as e:
+        connection.rollback()
+        print(f"Error upserting batch of {len(batch)} rows: {e}")
+        return 0
+    finally:
+        cursor.close()
+
+
 # -------------------------------------------------------------
 # 6️⃣ READ DATA FROM CSV FILE
 # -------------------------------------------------------------
+class MalformedRow(ValueError):
+    """Raised by parse_row() for a CSV record that cannot be inserted."""
+
+
+def parse_row(row, stable_ids=False):
+    """
+    Validates a csv.DictReader row and returns (user_id, name, email, age).
+    With stable_ids=True the user_id is derived from the email.
+    """
+    if None in row:
+        raise MalformedRow("too many fields")
+    name = (row.get('name') or '').strip()
+    email = (row.get('email') or '').strip()
+    age = (row.get('age') or '').strip()
+    if not name:
+        raise MalformedRow("missing name")
+    if '@' not in email:
+        raise MalformedRow(f"invalid email {email!r}")
+    if not age.isdigit() or len(age) > 3:
+        raise MalformedRow(f"invalid age {age!r}")
+    if stable_ids:
+        return (stable_user_id(email), name, email, int(age))
+    # Generate a unique UUID for each user
+    return (str(uuid.uuid4()), name, email, int(age))
+
+
+def validated_chunks(rows, chunk_size, errors=None, stable_ids=False):
+    """
+    Turns (location, DictReader row) pairs into lists of at most chunk_size
+    validated tuples. Malformed rows are reported and skipped; if an errors
+    list is given, (location, reason) pairs are appended to it.
+    """
+    chunk = []
+    for location, row in rows:
+        try:
+            chunk.append(parse_row(row, stable_ids))
+        except MalformedRow as e:
+            print(f"Skipping {location}: {e}")
+            if errors is not None:
+                errors.append((location, str(e)))
+            continue
+        if len(chunk) >= chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def stream_csv(file_path, chunk_size=1000, errors=None, stable_ids=False):
+    """
+    Generator that reads the CSV lazily and yields lists of at most
+    chunk_size validated tuples, so memory use does not depend on file size.
+    Malformed rows are reported and skipped; if an errors list is given,
+    (line_number, reason) pairs are appended to it.
+    """
+    errors = [] if errors is None else errors
+    loaded = 0
+    try:
+        with open(file_path, 'r', newline='') as file:
+            reader = csv.DictReader(file)
+            rows = ((f"line {reader.line_num}", row) for row in reader)
+            for chunk in validated_chunks(rows, chunk_size, errors, stable_ids):
+                loaded += len(chunk)
+                yield chunk
+    except FileNotFoundError:
+        print(f"File '{file_path}' not found.")
+        return
+    print(f"Read {loaded} records from '{file_path}' ({len(errors)} malformed rows skipped).")
+
+
 def read_csv(file_path):
     """Reads user data from a CSV file and returns a list of tuples."""
     data = []
+    for chunk in stream_csv(file_path):
+        data.extend(chunk)
+    return data
+
+
+# -------------------------------------------------------------
+# 6️⃣b PARALLEL SEEDING OVER BYTE-RANGE PARTITIONS
+# -------------------------------------------------------------
+def partition_csv(file_path, partitions):
+    """
+    Splits the CSV body into at most `partitions` byte ranges that start and
+    end on line boundaries. Returns (header, [(start, end), ...]).
+    Quoted fields containing newlines are not supported by this split.
+    """
+    size = os.path.getsize(file_path)
+    with open(file_path, 'rb') as file:
+        header = file.readline()
+        body_start = file.tell()
+        step = max((size - body_start) // max(partitions, 1), 1)
+        offsets = [body_start]
+        for i in range(1, partitions):
+            file.seek(body_start + i * step)
+            file.readline()  # move to the start of the next full line
+            offset = file.tell()
+            if offset >= size:
+                break
+            if offset > offsets[-1]:
+                offsets.append(offset)
+    offsets.append(size)
+    ranges = [(start, end) for start, end in zip(offsets, offsets[1:]) if end > start]
+    return header.decode('utf-8'), ranges
+
+
+def read_partition(file_path, header, start, end):
+    """Yields ("byte N", DictReader row) pairs for the lines in [start, end)."""
+    fieldnames = next(csv.reader([header]))
+    with open(file_path, 'rb') as file:
+        file.seek(start)
+        position = start
+        while position < end:
+            line = file.readline()
+            if not line:
+                break
+            offset, position = position, position + len(line)
+            text = line.decode('utf-8')
+            if not text.strip():
+                continue
+            values = next(csv.reader(io.StringIO(text)))
+            row = dict(zip(fieldnames, values))
+            if len(values) > len(fieldnames):
+                row[None] = values[len(fieldnames):]
+            yield f"byte {offset}", row
+
+
+def seed_partition(task):
+    """Worker: loads one byte range over its own connection and returns its counts."""
+    file_path, header, start, end, batch_size, delta = task
+    errors = []
+    connection = connect_to_prodev()
+    if not connection:
+        return {"inserted": 0, "errors": [(f"byte {start}", "no database connection")]}
     try:
-        with open(file_path, 'r') as file:
-            file = csv.DictReader(file)
-            for row in file:
-                # Generate a unique UUID for each user
-                user_id = str(uuid.uuid4())
-                name = row['name']
-                email = row['email']
-                age = row['age']
-                # Append as a tuple to the data list
-                data.append((user_id, name, email, age))
-        print(f"Loaded {len(data)} records from '{file_path}'.")
-        return data
-    except FileNotFoundError:
+        rows = read_partition(file_path, header, start, end)
+        chunks = validated_chunks(rows, batch_size, errors, stable_ids=delta)
+        inserted = load_batches(connection, chunks, delta)
+    finally:
+        connection.close()
+    return {"inserted": inserted, "errors": errors}
+
+
+def parallel_seed(file_path, workers=4, batch_size=1000, delta=False):
+    """
+    Seeds user_data from file_path using a pool of worker processes, one
+    byte-range partition and one connection per worker. Returns the merged
+    (written, errors) totals.
+    """
+    if not os.path.exists(file_path):
         print(f"File '{file_path}' not found.")
-    return []
+        return 0, []
+    if delta:
+        # Once, here, so the workers don't race to ALTER the table.
+        connection = connect_to_prodev()
+        ready = connection is not None and ensure_delta_schema(connection)
+        if connection:
+            connection.close()
+        if not ready:
+            print(DELTA_ABORTED)
+            return 0, []
+    header, ranges = partition_csv(file_path, workers)
+    tasks = [(file_path, header, start, end, batch_size, delta) for start, end in ranges]
+    inserted, errors = 0, []
+    start_time = time.perf_counter()
+    with Pool(processes=len(tasks) or 1) as pool:
+        for result in pool.imap_unordered(seed_partition, tasks):
+            inserted += result["inserted"]
+            errors.extend(result["errors"])
+    elapsed = time.perf_counter() - start_time
+    rate = inserted / elapsed if elapsed else 0
+    print(f"{len(tasks)} workers wrote {inserted} rows in {elapsed:.2f}s "
+          f"({rate:,.0f} rows/sec, {len(errors)} malformed rows skipped).")
+    return inserted, errors
 
 
 # -------------------------------------------------------------
 # 7️⃣ MAIN EXECUTION LOGIC
 # -------------------------------------------------------------
+def parse_args():
+    """Command line options for the seeder."""
+    parser = argparse.ArgumentParser(description="Seed the ALX_prodev database.")
+    parser.add_argument("csv_file", nargs="?", default="user_data.csv",
+                        help="CSV file with name,email,age columns")
+    parser.add_argument("--batch-size", type=int, default=1000,
+                        help="rows per INSERT batch / transaction")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="seed byte-range partitions in N parallel processes")
+    parser.add_argument("--delta", action="store_true",
+                        help="derive user_id from email and only upsert new or changed rows")
+    parser.add_argument("--dedupe", action="store_true",
+                        help="first delete all but one row per email (needed before the "
+                             "first --delta run on a table seeded more than once)")
+    parser.add_argument("--synthetic", type=int, metavar="N",
+                        help="generate N synthetic users instead of reading csv_file")
+    parser.add_argument("--seed", type=int, default=0,
+                        help="random seed for --synthetic (same seed, same rows)")
+    parser.add_argument("--age-dist", choices=AGE_DISTRIBUTIONS, default="uniform",
+                        help="age distribution for --synthetic")
+    parser.add_argument("--to-csv", metavar="PATH",
+                        help="with --synthetic, write a CSV instead of inserting")
+    return parser.parse_args()
+
+
 if __name__ == "__main__":
+    args = parse_args()
+
+    if args.synthetic and args.to_csv:
+        write_csv(args.to_csv, generate_users(args.synthetic, args.batch_size,
+                                              args.seed, args.age_dist))
+        raise SystemExit(0)
+
     # Connect to the MySQL server
     db_connection = connect_db()
     if db_connection:
@@ -148,11 +569,20 @@ if __name__ == "__main__":
     if prodev_connection:
         # Create the users table if it doesn't exist
         create_table(prodev_connection)
-        # Load user data from the CSV file
-        user_data = read_csv('user_data.csv')
-
-        # Step 6: Insert each record into the users table
-        for record in user_data:
-            insert_data(prodev_connection, record)
+        ensure_updated_at_column(prodev_connection)
+        if args.dedupe:
+            dedupe_emails(prodev_connection)
+        if args.synthetic:
+            # Generated batches go straight into the bulk loader
+            batches = generate_users(args.synthetic, args.batch_size, args.seed, args.age_dist,
+                                     id_func=stable_user_id if args.delta else None)
+            load_batches(prodev_connection, batches, args.delta)
+        elif args.workers > 1:
+            # Each worker process opens its own connection
+            parallel_seed(args.csv_file, args.workers, args.batch_size, args.delta)
+        else:
+            # Stream the CSV chunk by chunk straight into the table
+            chunks = stream_csv(args.csv_file, args.batch_size, stable_ids=args.delta)
+            load_batches(prodev_connection, chunks, args.delta)
         # Close the connection
         prodev_connection.close()
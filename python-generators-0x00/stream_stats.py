@@ -0,0 +1,187 @@
+"""
+One-pass streaming aggregates for generator pipelines.
+
+StreamingStats consumes values one at a time and keeps count, mean,
+variance (Welford), min/max, a fixed-bucket histogram and a mergeable
+quantile sketch, all in memory that does not grow with the stream.
+Two instances built over different partitions can be merged, so the
+aggregation can be split across connections, threads or processes.
+"""
+import math
+import random
+
+
+class QuantileSketch:
+    """
+    Mergeable approximate-quantile sketch (compactor hierarchy, KLL style).
+
+    Each level holds at most `k` items; an item at level h stands for 2**h
+    inputs. When a level fills up it is sorted and every other item is
+    promoted, so memory is O(k * log(n / k)) and the rank error is roughly
+    O(log(n / k) / k).
+    """
+
+    def __init__(self, k=200, seed=None):
+        self.k = k
+        self.count = 0
+        self.levels = [[]]
+        self._random = random.Random(seed)
+
+    def update(self, value):
+        self.levels[0].append(value)
+        self.count += 1
+        if len(self.levels[0]) >= self.k:
+            self._compress()
+
+    def _compress(self):
+        for height in range(len(self.levels)):
+            level = self.levels[height]
+            if len(level) < self.k:
+                continue
+            if height + 1 == len(self.levels):
+                self.levels.append([])
+            level.sort()
+            # An odd item out stays behind so no weight is lost.
+            keep = [level.pop()] if len(level) % 2 else []
+            offset = self._random.randint(0, 1)
+            self.levels[height + 1].extend(level[offset::2])
+            self.levels[height] = keep
+
+    def merge(self, other):
+        """Folds another sketch into this one (in place) and returns self."""
+        if other.k != self.k:
+            raise ValueError("cannot merge sketches with different k")
+        while len(self.levels) < len(other.levels):
+            self.levels.append([])
+        for height, level in enumerate(other.levels):
+            self.levels[height].extend(level)
+        self.count += other.count
+        self._compress()
+        return self
+
+    def quantile(self, q):
+        """Approximate value at quantile q (0 <= q <= 1); None when empty."""
+        if not 0 <= q <= 1:
+            raise ValueError("q must be between 0 and 1")
+        weighted = sorted(
+            (value, 1 << height)
+            for height, level in enumerate(self.levels)
+            for value in level
+        )
+        if not weighted:
+            return None
+        total = sum(weight for _, weight in weighted)
+        target = q * total
+        seen = 0
+        for value, weight in weighted:
+            seen += weight
+            if seen >= target:
+                return value
+        return weighted[-1][0]
+
+
+class StreamingStats:
+    """
+    Count, mean, variance, min/max, histogram and quantiles in one pass.
+
+    The histogram has `buckets` equal-width buckets over [lower, upper);
+    values outside the range are counted in `underflow` / `overflow`.
+    """
+
+    def __init__(self, lower=0, upper=100, buckets=10, sketch_k=200, seed=None):
+        if upper <= lower or buckets < 1:
+            raise ValueError("need lower < upper and at least one bucket")
+        self.lower = lower
+        self.upper = upper
+        self.histogram = [0] * buckets
+        self.underflow = 0
+        self.overflow = 0
+        self.count = 0
+        self.mean = 0.0
+        self._m2 = 0.0
+        self.min = None
+        self.max = None
+        self.sketch = QuantileSketch(sketch_k, seed)
+
+    @classmethod
+    def from_iterable(cls, values, **kwargs):
+        stats = cls(**kwargs)
+        for value in values:
+            stats.update(value)
+        return stats
+
+    def update(self, value):
+        value = float(value)
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self._m2 += delta * (value - self.mean)
+        if self.min is None or value < self.min:
+            self.min = value
+        if self.max is None or value > self.max:
+            self.max = value
+        if value < self.lower:
+            self.underflow += 1
+        elif value >= self.upper:
+            self.overflow += 1
+        else:
+            width = (self.upper - self.lower) / len(self.histogram)
+            index = min(int((value - self.lower) // width), len(self.histogram) - 1)
+            self.histogram[index] += 1
+        self.sketch.update(value)
+
+    def merge(self, other):
+        """Combines another partition's stats into this one (in place)."""
+        if (other.lower, other.upper, len(other.histogram)) != \
+                (self.lower, self.upper, len(self.histogram)):
+            raise ValueError("cannot merge stats with different histogram buckets")
+        if other.count:
+            total = self.count + other.count
+            delta = other.mean - self.mean
+            self._m2 += other._m2 + delta * delta * self.count * other.count / total
+            self.mean += delta * other.count / total
+            self.count = total
+            self.min = other.min if self.min is None else min(self.min, other.min)
+            self.max = other.max if self.max is None else max(self.max, other.max)
+            self.histogram = [a + b for a, b in zip(self.histogram, other.histogram)]
+            self.underflow += other.underflow
+            self.overflow += other.overflow
+        self.sketch.merge(other.sketch)
+        return self
+
+    @property
+    def variance(self):
+        """Population variance."""
+        return self._m2 / self.count if self.count else 0.0
+
+    @property
+    def sample_variance(self):
+        return self._m2 / (self.count - 1) if self.count > 1 else 0.0
+
+    @property
+    def stddev(self):
+        return math.sqrt(self.variance)
+
+    def quantile(self, q):
+        return self.sketch.quantile(q)
+
+    def bucket_edges(self):
+        width = (self.upper - self.lower) / len(self.histogram)
+        return [(self.lower + i * width, self.lower + (i + 1) * width)
+                for i in range(len(self.histogram))]
+
+    def summary(self):
+        return {
+            "count": self.count,
+            "mean": self.mean,
+            "variance": self.variance,
+            "stddev": self.stddev,
+            "min": self.min,
+            "max": self.max,
+            "p50": self.quantile(0.5),
+            "p90": self.quantile(0.9),
+            "p99": self.quantile(0.99),
+            "histogram": self.histogram,
+            "underflow": self.underflow,
+            "overflow": self.overflow,
+        }
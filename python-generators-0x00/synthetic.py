@@ -0,0 +1,146 @@
+"""
+Synthetic user_data for load testing.
+
+generate_users() yields batches of (user_id, name, email, age) tuples
+that can go straight into seed.load_batches() or to a CSV file. With
+NumPy installed, names, ages and UUIDs are drawn for a whole batch at
+once; otherwise a pure-Python fallback is used. The same seed always
+produces the same rows (for a given backend and batch size).
+
+    python seed.py --synthetic 10000000 --batch-size 20000
+    python synthetic.py 1000000 users.csv
+"""
+import csv
+import random
+import sys
+import time
+
+try:
+    import numpy as np
+except ImportError:  # vectorized generation is optional
+    np = None
+
+FIRST_NAMES = [
+    "James", "Mary", "John", "Patricia", "Robert", "Jennifer", "Michael", "Linda",
+    "William", "Elizabeth", "David", "Barbara", "Richard", "Susan", "Joseph", "Jessica",
+    "Thomas", "Sarah", "Charles", "Karen", "Kwame", "Ama", "Kofi", "Abena", "Yaw",
+    "Akosua", "Chinedu", "Ngozi", "Tunde", "Aisha", "Juan", "Sofia", "Wei", "Mei",
+    "Arjun", "Priya", "Omar", "Fatima", "Lukas", "Emma",
+]
+LAST_NAMES = [
+    "Smith", "Johnson", "Williams", "Brown", "Jones", "Garcia", "Miller", "Davis",
+    "Rodriguez", "Martinez", "Mensah", "Owusu", "Boateng", "Asante", "Okafor", "Adeyemi",
+    "Nguyen", "Chen", "Wang", "Kumar", "Patel", "Khan", "Muller", "Schmidt", "Rossi",
+    "Tenge", "Silva", "Kowalski", "Ivanov", "Cohen",
+]
+DOMAINS = ["example.com", "mail.test", "alx.test", "users.example.org"]
+
+AGE_DISTRIBUTIONS = ("uniform", "normal")
+
+
+def _ages_numpy(rng, size, dist, age_min, age_max, mean, std):
+    if dist == "normal":
+        ages = np.rint(rng.normal(mean, std, size))
+        return np.clip(ages, age_min, age_max).astype(np.int64)
+    return rng.integers(age_min, age_max + 1, size)
+
+
+def _uuids_numpy(rng, size):
+    """Random version-4 UUID strings, built from one block of random bytes."""
+    raw = rng.integers(0, 256, size=(size, 16), dtype=np.uint8)
+    raw[:, 6] = (raw[:, 6] & 0x0F) | 0x40
+    raw[:, 8] = (raw[:, 8] & 0x3F) | 0x80
+    hexed = raw.tobytes().hex()
+    return [
+        f"{h[0:8]}-{h[8:12]}-{h[12:16]}-{h[16:20]}-{h[20:32]}"
+        for h in (hexed[i:i + 32] for i in range(0, size * 32, 32))
+    ]
+
+
+def _batches_numpy(count, batch_size, seed, dist, age_min, age_max, mean, std):
+    rng = np.random.default_rng(seed)
+    first = np.array(FIRST_NAMES, dtype=object)
+    last = np.array(LAST_NAMES, dtype=object)
+    first_lower = np.array([n.lower() for n in FIRST_NAMES], dtype=object)
+    last_lower = np.array([n.lower() for n in LAST_NAMES], dtype=object)
+    domains = np.array(DOMAINS, dtype=object)
+    for start in range(0, count, batch_size):
+        size = min(batch_size, count - start)
+        f = rng.integers(0, len(first), size)
+        l = rng.integers(0, len(last), size)
+        d = rng.integers(0, len(domains), size)
+        names = first[f] + " " + last[l]
+        # The running index keeps every email unique.
+        index = np.arange(start, start + size).astype(str).astype(object)
+        emails = first_lower[f] + "." + last_lower[l] + index + "@" + domains[d]
+        ages = _ages_numpy(rng, size, dist, age_min, age_max, mean, std)
+        yield list(zip(_uuids_numpy(rng, size), names.tolist(), emails.tolist(), ages.tolist()))
+
+
+_UUID4_CLEAR = ~((0xF << 76) | (0xC << 60)) & ((1 << 128) - 1)
+_UUID4_SET = (0x4 << 76) | (0x8 << 60)
+
+
+def _uuid4_string(bits):
+    """Formats 128 random bits as a version-4 UUID without building a UUID object."""
+    h = f"{bits & _UUID4_CLEAR | _UUID4_SET:032x}"
+    return f"{h[0:8]}-{h[8:12]}-{h[12:16]}-{h[16:20]}-{h[20:32]}"
+
+
+def _batches_python(count, batch_size, seed, dist, age_min, age_max, mean, std):
+    rng = random.Random(seed)
+    for start in range(0, count, batch_size):
+        batch = []
+        for index in range(start, min(start + batch_size, count)):
+            first = rng.choice(FIRST_NAMES)
+            last = rng.choice(LAST_NAMES)
+            if dist == "normal":
+                age = min(max(round(rng.gauss(mean, std)), age_min), age_max)
+            else:
+                age = rng.randint(age_min, age_max)
+            batch.append((
+                _uuid4_string(rng.getrandbits(128)),
+                f"{first} {last}",
+                f"{first.lower()}.{last.lower()}{index}@{rng.choice(DOMAINS)}",
+                age,
+            ))
+        yield batch
+
+
+def generate_users(count, batch_size=50_000, seed=0, age_dist="uniform",
+                   age_min=18, age_max=80, age_mean=38, age_std=12, id_func=None):
+    """
+    Yields batches of synthetic (user_id, name, email, age) tuples.
+    age_dist is "uniform" over [age_min, age_max] or "normal" with
+    age_mean/age_std clipped to that range. id_func(email), e.g.
+    seed.stable_user_id, replaces the random UUIDs.
+    """
+    if age_dist not in AGE_DISTRIBUTIONS:
+        raise ValueError(f"age_dist must be one of {AGE_DISTRIBUTIONS}")
+    make = _batches_numpy if np is not None else _batches_python
+    for batch in make(count, batch_size, seed, age_dist, age_min, age_max, age_mean, age_std):
+        if id_func is not None:
+            batch = [(id_func(email), name, email, age) for _, name, email, age in batch]
+        yield batch
+
+
+def write_csv(file_path, batches):
+    """Writes batches as a name,email,age CSV that seed.py can load."""
+    written = 0
+    start = time.perf_counter()
+    with open(file_path, "w", newline="") as file:
+        writer = csv.writer(file)
+        writer.writerow(["name", "email", "age"])
+        for batch in batches:
+            writer.writerows(row[1:] for row in batch)
+            written += len(batch)
+    elapsed = time.perf_counter() - start
+    rate = written / elapsed if elapsed else 0
+    print(f"Wrote {written} rows to '{file_path}' in {elapsed:.2f}s ({rate:,.0f} rows/sec).")
+    return written
+
+
+if __name__ == "__main__":
+    total = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    out = sys.argv[2] if len(sys.argv) > 2 else "user_data.csv"
+    write_csv(out, generate_users(total))
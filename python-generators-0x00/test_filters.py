@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""Unit tests for the filters module.
+"""
+import unittest
+
+from filters import And, Field, Not, Or, Where, plan
+
+
+class TestPredicates(unittest.TestCase):
+    """Test cases for compiling and evaluating predicates.
+    """
+
+    def test_comparison_to_sql(self):
+        """Comparisons compile to a parameterized clause.
+        """
+        self.assertEqual((Field("age") >= 18).to_sql(), ("`age` >= %s", [18]))
+        self.assertEqual((Field("email") != "").to_sql(), ("`email` <> %s", [""]))
+
+    def test_combinators_to_sql(self):
+        """&, | and ~ compile to AND, OR and NOT with params in order.
+        """
+        predicate = (Field("age") > 25) & ((Field("name") == "Ann") | ~Field("age").is_in([1, 2]))
+        self.assertEqual(predicate.to_sql(), (
+            "(`age` > %s AND (`name` = %s OR NOT (`age` IN (%s, %s))))",
+            [25, "Ann", 1, 2],
+        ))
+
+    def test_empty_in_matches_nothing(self):
+        """An empty IN list compiles to a false clause.
+        """
+        predicate = Field("age").is_in([])
+        self.assertEqual(predicate.to_sql(), ("1 = 0", []))
+        self.assertFalse(predicate({"age": 1}))
+
+    def test_evaluation_matches_sql_semantics(self):
+        """Predicates evaluate the same way in Python on dict rows.
+        """
+        predicate = (Field("age") > 25) & ~(Field("name") == "Bob")
+        self.assertTrue(predicate({"age": 30, "name": "Ann"}))
+        self.assertFalse(predicate({"age": 30, "name": "Bob"}))
+        self.assertFalse(predicate({"age": 20, "name": "Ann"}))
+
+    def test_nested_and_is_flattened(self):
+        """Nested ANDs become one flat list of conjuncts.
+        """
+        predicate = (Field("a") > 1) & ((Field("b") > 2) & (Field("c") > 3))
+        self.assertIsInstance(predicate, And)
+        self.assertEqual(len(predicate.parts), 3)
+
+    def test_invalid_column_name(self):
+        """Column names that are not plain identifiers are rejected.
+        """
+        with self.assertRaises(ValueError):
+            Field("age; DROP TABLE user_data")
+
+    def test_where_never_compiles(self):
+        """Where(callable), and anything containing it, stays in Python.
+        """
+        where = Where(lambda row: row["age"] % 2 == 0)
+        self.assertIsNone(where.to_sql())
+        self.assertIsNone(Or(Field("age") > 1, where).to_sql())
+        self.assertIsNone(Not(where).to_sql())
+
+
+class TestPlan(unittest.TestCase):
+    """Test cases for splitting predicates into pushed-down SQL and residual.
+    """
+
+    def setUp(self):
+        self.even = Where(lambda row: row["age"] % 2 == 0)
+
+    def test_no_predicate(self):
+        """No predicate: no clause and no residual.
+        """
+        self.assertEqual(plan(None), (None, [], None))
+
+    def test_fully_pushed_down(self):
+        """A compilable predicate leaves no residual.
+        """
+        clause, params, residual = plan((Field("age") > 25) & (Field("email") != ""))
+        self.assertEqual(clause, "(`age` > %s AND `email` <> %s)")
+        self.assertEqual(params, [25, ""])
+        self.assertIsNone(residual)
+
+    def test_pushdown_disabled(self):
+        """pushdown=False keeps the whole predicate in Python.
+        """
+        predicate = Field("age") > 25
+        self.assertEqual(plan(predicate, pushdown=False), (None, [], predicate))
+
+    def test_partial_pushdown_of_and(self):
+        """Compilable conjuncts go to SQL; the rest is the residual.
+        """
+        clause, params, residual = plan((Field("age") > 25) & self.even & (Field("name") != ""))
+        self.assertEqual(clause, "(`age` > %s AND `name` <> %s)")
+        self.assertEqual(params, [25, ""])
+        self.assertIs(residual, self.even)
+
+    def test_partial_pushdown_keeps_all_residual_parts(self):
+        """Several Python-only conjuncts are combined into one residual.
+        """
+        positive = Where(lambda row: row["age"] > 0)
+        clause, params, residual = plan((Field("age") < 90) & self.even & positive)
+        self.assertEqual((clause, params), ("(`age` < %s)", [90]))
+        self.assertTrue(residual({"age": 4}))
+        self.assertFalse(residual({"age": 3}))
+        self.assertFalse(residual({"age": -2}))
+
+    def test_or_with_python_part_is_not_split(self):
+        """An OR cannot be split, so it stays entirely in Python.
+        """
+        predicate = (Field("age") > 25) | self.even
+        self.assertEqual(plan(predicate), (None, [], predicate))
+
+    def test_split_is_equivalent(self):
+        """SQL clause AND residual selects the same rows as the predicate.
+        """
+        predicate = (Field("age") >= 20) & self.even & (Field("age") < 30)
+        _, params, residual = plan(predicate)
+        rows = [{"age": age} for age in range(15, 35)]
+        pushed = [row for row in rows if params[0] <= row["age"] < params[1]]
+        self.assertEqual([row for row in pushed if residual(row)],
+                         [row for row in rows if predicate(row)])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""Unit tests for the stream_stats module.
+"""
+import random
+import statistics
+import unittest
+
+from stream_stats import QuantileSketch, StreamingStats
+
+
+class TestStreamingStats(unittest.TestCase):
+    """Test cases for StreamingStats.
+    """
+
+    def setUp(self):
+        rng = random.Random(7)
+        self.values = [rng.randint(0, 99) for _ in range(5000)]
+
+    def test_matches_exact_statistics(self):
+        """Mean, variance, min and max agree with the statistics module.
+        """
+        stats = StreamingStats.from_iterable(self.values)
+        self.assertEqual(stats.count, len(self.values))
+        self.assertAlmostEqual(stats.mean, statistics.fmean(self.values))
+        self.assertAlmostEqual(stats.variance, statistics.pvariance(self.values))
+        self.assertAlmostEqual(stats.sample_variance, statistics.variance(self.values))
+        self.assertEqual(stats.min, min(self.values))
+        self.assertEqual(stats.max, max(self.values))
+
+    def test_merge_equals_single_pass(self):
+        """Merging partition stats gives the same result as one pass.
+        """
+        whole = StreamingStats.from_iterable(self.values)
+        merged = StreamingStats()
+        for start in range(0, len(self.values), 1300):
+            merged.merge(StreamingStats.from_iterable(self.values[start:start + 1300]))
+        self.assertEqual(merged.count, whole.count)
+        self.assertAlmostEqual(merged.mean, whole.mean)
+        self.assertAlmostEqual(merged.variance, whole.variance)
+        self.assertEqual((merged.min, merged.max), (whole.min, whole.max))
+        self.assertEqual(merged.histogram, whole.histogram)
+
+    def test_merge_with_empty_partition(self):
+        """Empty partitions on either side of a merge change nothing.
+        """
+        stats = StreamingStats.from_iterable([1, 2, 3])
+        stats.merge(StreamingStats())
+        self.assertEqual((stats.count, stats.mean, stats.min), (3, 2.0, 1))
+        empty = StreamingStats().merge(StreamingStats.from_iterable([1, 2, 3]))
+        self.assertEqual((empty.count, empty.mean, empty.max), (3, 2.0, 3))
+
+    def test_merge_rejects_different_buckets(self):
+        """Stats with different histogram layouts cannot be merged.
+        """
+        with self.assertRaises(ValueError):
+            StreamingStats(buckets=10).merge(StreamingStats(buckets=5))
+
+    def test_histogram_bounds(self):
+        """Values outside [lower, upper) go to underflow/overflow.
+        """
+        stats = StreamingStats.from_iterable([-1, 0, 9.999, 10, 99.99, 100, 250],
+                                             lower=0, upper=100, buckets=10)
+        self.assertEqual(stats.underflow, 1)
+        self.assertEqual(stats.overflow, 2)
+        self.assertEqual(stats.histogram[0], 2)
+        self.assertEqual(stats.histogram[1], 1)
+        self.assertEqual(stats.histogram[9], 1)
+        self.assertEqual(sum(stats.histogram) + stats.underflow + stats.overflow, 7)
+
+
+class TestQuantileSketch(unittest.TestCase):
+    """Test cases for QuantileSketch.
+    """
+
+    def assertRankClose(self, data, value, q, tolerance):
+        """The rank of `value` in sorted data is within tolerance of q.
+        """
+        rank = sum(1 for x in data if x <= value) / len(data)
+        self.assertLessEqual(abs(rank - q), tolerance, f"q={q} value={value} rank={rank}")
+
+    def test_quantiles_within_rank_error(self):
+        """Quantiles of 100k values are within 2% rank error.
+        """
+        rng = random.Random(3)
+        data = [rng.random() for _ in range(100_000)]
+        sketch = QuantileSketch(k=200, seed=1)
+        for value in data:
+            sketch.update(value)
+        ordered = sorted(data)
+        for q in (0.01, 0.1, 0.5, 0.9, 0.99):
+            self.assertRankClose(ordered, sketch.quantile(q), q, 0.02)
+
+    def test_merged_sketch_accuracy(self):
+        """A sketch merged from partitions stays within the rank error.
+        """
+        rng = random.Random(5)
+        data = [rng.gauss(40, 12) for _ in range(60_000)]
+        merged = QuantileSketch(k=200, seed=1)
+        for start in range(0, len(data), 7_000):
+            part = QuantileSketch(k=200, seed=start)
+            for value in data[start:start + 7_000]:
+                part.update(value)
+            merged.merge(part)
+        self.assertEqual(merged.count, len(data))
+        ordered = sorted(data)
+        for q in (0.05, 0.5, 0.95):
+            self.assertRankClose(ordered, merged.quantile(q), q, 0.02)
+
+    def test_memory_is_bounded(self):
+        """Stored items grow far slower than the input.
+        """
+        sketch = QuantileSketch(k=100, seed=0)
+        for value in range(200_000):
+            sketch.update(value)
+        stored = sum(len(level) for level in sketch.levels)
+        self.assertLess(stored, 100 * len(sketch.levels))
+        self.assertLess(stored, 2_000)
+
+    def test_small_and_empty(self):
+        """Exact answers below k items; None when empty; q is validated.
+        """
+        sketch = QuantileSketch(k=50)
+        self.assertIsNone(sketch.quantile(0.5))
+        for value in [5, 1, 3]:
+            sketch.update(value)
+        self.assertEqual(sketch.quantile(0), 1)
+        self.assertEqual(sketch.quantile(0.5), 3)
+        self.assertEqual(sketch.quantile(1), 5)
+        with self.assertRaises(ValueError):
+            sketch.quantile(1.5)
+
+    def test_merge_rejects_different_k(self):
+        """Sketches with different k cannot be merged.
+        """
+        with self.assertRaises(ValueError):
+            QuantileSketch(k=100).merge(QuantileSketch(k=200))
+
+
+if __name__ == "__main__":
+    unittest.main()